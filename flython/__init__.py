@@ -1,8 +1,13 @@
 import warnings
 
+__version__ = '0.0.2'
+
 from . import defaults
+from .core import archive
 from .core import block
+from .core import conditions
 from .core import discrete
+from .core import observers
 from .core.continuous import Continuous
 from .core.logger import logger
 from .core import settings as settings_module
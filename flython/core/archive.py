@@ -0,0 +1,203 @@
+import json
+import numpy as np
+import os
+import zlib
+
+index_name = 'index.json'
+
+
+def _column(path, name):
+    return os.path.join(path, name + '.col')
+
+
+class Writer:
+    """Append results to a columnar archive
+
+    The archive is a directory holding one file per field and an index.
+    Rows are buffered and written in chunks of chunk_rows, each field
+    chunk is optionally compressed with zlib at the given level. The
+    index, rewritten after every chunk, records the time range and the
+    byte range in every column of each chunk, so an archive is readable
+    while a run is still appending to it. A writer can be used as the
+    simulator recorder, its result is a Reader. An existing archive is
+    only replaced with overwrite=True.
+
+    """
+
+    def __init__(self, path, chunk_rows=65536, compress=None,
+                 overwrite=False):
+        self.path = path
+        self.chunk_rows = chunk_rows
+        self.compress = compress
+        self.chunks = []
+        self._buffer = None
+        os.makedirs(path, exist_ok=True)
+        files = [name for name in os.listdir(path)
+                 if name.endswith('.col') or name == index_name]
+        if files and not overwrite:
+            raise FileExistsError("Archive '{}' is not empty, use "
+                                  "overwrite=True to replace it.".format(path))
+        for name in files:
+            os.remove(os.path.join(path, name))
+
+    def append(self, rows):
+        if self._buffer is None:
+            self.dtype = rows.dtype
+            self._buffer = np.empty(self.chunk_rows, rows.dtype)
+            self._offset = 0
+            self._sizes = {name: 0 for name in self.dtype.names}
+        while len(rows):
+            n = min(len(rows), self.chunk_rows - self._offset)
+            self._buffer[self._offset:self._offset+n] = rows[:n]
+            self._offset += n
+            rows = rows[n:]
+            if self._offset == self.chunk_rows:
+                self.flush()
+
+    def flush(self):
+        """Write buffered rows as a chunk and update the index"""
+
+        if not self._offset:
+            return
+        rows = self._buffer[:self._offset]
+        chunk = dict(rows=len(rows), t=[float(rows['t'][0]),
+                                        float(rows['t'][-1])], columns={})
+        for name in self.dtype.names:
+            data = np.ascontiguousarray(rows[name]).tobytes()
+            if self.compress is not None:
+                data = zlib.compress(data, self.compress)
+            with open(_column(self.path, name), 'ab') as f:
+                f.write(data)
+            chunk['columns'][name] = [self._sizes[name], len(data)]
+            self._sizes[name] += len(data)
+        self.chunks.append(chunk)
+        self._offset = 0
+
+        index = dict(dtype=[(name, self.dtype[name].str)
+                            for name in self.dtype.names],
+                     compress=self.compress, chunks=self.chunks)
+        tmp = os.path.join(self.path, index_name + '.tmp')
+        with open(tmp, 'w') as f:
+            json.dump(index, f)
+        os.replace(tmp, os.path.join(self.path, index_name))
+
+    def close(self):
+        if self._buffer is not None:
+            self.flush()
+
+    def result(self):
+        self.close()
+        return Reader(self.path)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+
+class Reader:
+    """Lazy reader of a columnar archive
+
+    Only the requested columns and the chunks overlapping the requested
+    time range are read. Uncompressed columns are memory-mapped.
+
+    """
+
+    def __init__(self, path):
+        self.path = path
+        with open(os.path.join(path, index_name)) as f:
+            index = json.load(f)
+        self.dtype = np.dtype([tuple(d) for d in index['dtype']])
+        self.compress = index['compress']
+        self.chunks = index['chunks']
+        self._starts = np.cumsum([0] + [c['rows'] for c in self.chunks])
+        self._maps = {}
+
+    @property
+    def fields(self):
+        return self.dtype.names
+
+    def __len__(self):
+        return int(self._starts[-1])
+
+    def _map(self, name):
+        if name not in self._maps:
+            self._maps[name] = np.memmap(
+                _column(self.path, name), self.dtype[name], 'r')
+        return self._maps[name]
+
+    def _chunk(self, name, k):
+        offset, size = self.chunks[k]['columns'][name]
+        dtype = self.dtype[name]
+        if self.compress is None:
+            return self._map(name)[offset//dtype.itemsize:
+                                   (offset+size)//dtype.itemsize]
+        with open(_column(self.path, name), 'rb') as f:
+            f.seek(offset)
+            return np.frombuffer(zlib.decompress(f.read(size)), dtype)
+
+    def _range(self, t0, t1):
+        """Return chunks and row slice of the rows with t0 <= t <= t1"""
+
+        ks = [k for k, c in enumerate(self.chunks)
+              if (t1 is None or c['t'][0] <= t1)
+              and (t0 is None or c['t'][1] >= t0)]
+        if not ks:
+            return ks, slice(0, 0)
+        base = self._starts[ks[0]]
+        start = 0 if t0 is None \
+            else int(np.searchsorted(self._chunk('t', ks[0]), t0))
+        if t1 is None:
+            stop = self._starts[ks[-1]+1] - base
+        else:
+            stop = self._starts[ks[-1]] - base + int(np.searchsorted(
+                self._chunk('t', ks[-1]), t1, 'right'))
+        return ks, slice(start, int(stop))
+
+    def _span(self, name, ks):
+        """Return the rows of consecutive chunks of one field"""
+
+        if self.compress is None:
+            # Chunks are contiguous in the column file, no copy
+            i = self.chunks[ks[0]]['columns'][name][0] \
+                // self.dtype[name].itemsize
+            return self._map(name)[
+                i:i+self._starts[ks[-1]+1]-self._starts[ks[0]]]
+        return np.concatenate([self._chunk(name, k) for k in ks])
+
+    def column(self, name, t0=None, t1=None):
+        """Return one field, within [t0, t1] if given"""
+
+        ks, rows = self._range(t0, t1)
+        if not ks:
+            return np.empty(0, self.dtype[name])
+        return self._span(name, ks)[rows]
+
+    def read(self, fields=None, t0=None, t1=None):
+        """Return a structured array of the given fields and time range"""
+
+        fields = list(fields or self.fields)
+        if 't' not in fields:
+            fields.insert(0, 't')
+        ks, rows = self._range(t0, t1)
+        data = np.empty(rows.stop - rows.start,
+                        [(name, self.dtype[name]) for name in fields])
+        if ks:
+            for name in fields:
+                data[name] = self._span(name, ks)[rows]
+        return data
+
+    def __getitem__(self, name):
+        return self.column(name)
+
+
+def save(path, data, chunk_rows=65536, compress=None, overwrite=False):
+    """Save results as a columnar archive"""
+    with Writer(path, chunk_rows, compress, overwrite) as writer:
+        writer.append(data)
+
+
+def load(path):
+    """Open a columnar archive, see Reader"""
+    return Reader(path)
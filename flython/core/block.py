@@ -1,3 +1,5 @@
+import copy
+
 w1 = "Parameter '{}.{}' changed during active session."
 
 
@@ -11,7 +13,9 @@ class Block:
         super().__setattr__('_simulator', simulator)
 
         self.u = None
-        self.x = parameters.pop('x', self._x if hasattr(self, '_x') else None)
+        # Initial state is copied, blocks update their state in place
+        self.x = copy.copy(parameters.pop(
+            'x', self._x if hasattr(self, '_x') else None))
 
         # Assign parameters
         for k in self._parameters:
@@ -33,14 +37,23 @@ class Block:
         super().__setattr__(name, value)
         if name in self._parameters \
            and self._simulator.status is 'active':
-            self._simulator.warn(w1.format(self._name, name))
-            self.validate()
+            self._simulator.warn(w1, self._name, name)
+            self.validate((name, ))
+
+    def validate(self, names=None):
+        """Perform block validation
+
+        When names of changed parameters are given, only validation
+        methods of classes which declare some of them in `_depends`, or
+        do not declare `_depends` at all, are run.
 
-    def validate(self):
-        """Perform block validation"""
+        """
         for sub_block in reversed(self.__class__.__mro__):
             if '_validate' in sub_block.__dict__:
-                sub_block._validate(self)
+                depends = sub_block.__dict__.get('_depends')
+                if names is None or depends is None \
+                   or not set(names).isdisjoint(depends):
+                    sub_block._validate(self)
 
 
 class Definition:
@@ -0,0 +1,157 @@
+import hashlib
+import json
+import numpy as np
+import os
+import tempfile
+
+cache_hit = "Cached results of '{}' loaded."
+
+
+def _digest(h, value):
+    """Update hash with a (nested) parameter value"""
+
+    if isinstance(value, np.ndarray):
+        h.update(b'ndarray')
+        h.update(value.dtype.str.encode())
+        h.update(repr(value.shape).encode())
+        h.update(np.ascontiguousarray(value).tobytes())
+    elif isinstance(value, dict):
+        h.update(b'dict')
+        for k in sorted(value):
+            _digest(h, k)
+            _digest(h, value[k])
+    elif isinstance(value, (list, tuple)):
+        # Includes namedtuples, e.g. waypoints
+        h.update(type(value).__name__.encode())
+        for v in value:
+            _digest(h, v)
+    elif isinstance(value, type):
+        h.update('{}.{}'.format(value.__module__,
+                                value.__qualname__).encode())
+    else:
+        h.update(repr(value).encode())
+
+
+def key(simulator):
+    """Return hash of everything the results of a run depend on
+
+    That is the model source, the resolved block parameters and
+    initial states, the simulation settings, the flython version and
+    the state of the global NumPy random generator.
+
+    """
+
+    from .. import __version__
+
+    h = hashlib.sha256()
+    with open(simulator.model.__file__, 'rb') as f:
+        h.update(f.read())
+    for block in sorted(simulator._blocks, key=lambda b: b._name):
+        _digest(h, block._name)
+        _digest(h, type(block))
+        _digest(h, block.x)
+        _digest(h, {k: getattr(block, k) for k in block._parameters})
+    for name in ('solver', 't_beg', 't_end', 'sample_time'):
+        _digest(h, getattr(simulator, name))
+    _digest(h, __version__)
+    _digest(h, np.random.get_state())
+    return h.hexdigest()
+
+
+class ResultCache:
+    """Content-addressed on-disk cache of run results
+
+    Results are stored as .npy files and loaded memory-mapped, the
+    names of the fields held over the step (see results.Results) in
+    .json files next to them. When the total size exceeds max_bytes,
+    least recently used results are evicted.
+
+    """
+
+    def __init__(self, directory=None, max_bytes=2**30, bypass=False):
+        self.directory = os.path.expanduser(
+            directory or os.path.join('~', '.cache', 'flython'))
+        self.max_bytes = max_bytes
+        self.bypass = bypass
+        os.makedirs(self.directory, exist_ok=True)
+
+    def _path(self, k, extension='.npy'):
+        return os.path.join(self.directory, k + extension)
+
+    def run(self, simulator, bypass=False):
+        """Return results of a complete run, from the cache if possible"""
+
+        k = key(simulator)
+        path = self._path(k)
+        if not (bypass or self.bypass) and os.path.exists(path) \
+           and os.path.exists(self._path(k, '.json')):
+            with open(self._path(k, '.json')) as f:
+                held = tuple(json.load(f)['held'])
+            data = np.load(path, mmap_mode='r')
+            # Mark as recently used
+            os.utime(path)
+            # Run state of a completed run, see Simulator._start
+            simulator.data = data
+            simulator._offset = len(data)
+            simulator._held = held
+            simulator.t = simulator.t_end
+            simulator.current_step = simulator.total_number_of_steps = \
+                round((simulator.t_end - simulator.t_beg)
+                      / simulator.sample_time)
+            simulator.stop_reason = None
+            simulator.events = []
+            simulator._event_time = None
+            simulator.status = 'finished'
+            simulator._observer.notice(simulator, cache_hit.format(
+                os.path.basename(simulator.model.__file__)))
+            return simulator._result()
+
+        simulator._start()
+        simulator._run()
+        data = simulator._result()
+        if simulator.status == 'finished':
+            self.store(k, data, simulator._held)
+        return data
+
+    def store(self, k, data, held=()):
+        # Held fields first, results are only loaded when both exist
+        with open(self._path(k, '.json'), 'w') as f:
+            json.dump(dict(held=list(held or ())), f)
+        fd, tmp = tempfile.mkstemp('.tmp', dir=self.directory)
+        with os.fdopen(fd, 'wb') as f:
+            np.save(f, data)
+        os.replace(tmp, self._path(k))
+        self.evict()
+
+    def evict(self):
+        """Remove least recently used results above max_bytes"""
+
+        entries = []
+        for name in os.listdir(self.directory):
+            if name.endswith('.npy'):
+                st = os.stat(os.path.join(self.directory, name))
+                entries.append((st.st_mtime, st.st_size, name))
+        total = sum(e[1] for e in entries)
+        for mtime, size, name in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            self._remove(name[:-4])
+            total -= size
+
+    def _remove(self, k):
+        for extension in ('.npy', '.json'):
+            try:
+                os.remove(self._path(k, extension))
+            except FileNotFoundError:
+                pass
+
+    def clear(self):
+        for name in os.listdir(self.directory):
+            if name.endswith('.npy'):
+                self._remove(name[:-4])
+
+
+def create(cache):
+    """Return a result cache given True or an instance"""
+
+    return ResultCache() if cache is True else cache
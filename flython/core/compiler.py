@@ -0,0 +1,204 @@
+import numpy as np
+
+from .discrete import NormalOrder, ReverseOrder, Static
+
+
+def _static(block, simulator, d, ratio):
+    g = block.g
+    if ratio == 1:
+        def __call__(self, u):
+            d['u'] = u
+            d['_prev_step'] = simulator.current_step
+            return g(d['x'], u)
+    else:
+        def __call__(self, u):
+            n = simulator.current_step
+            if n - d['_prev_step'] >= ratio:
+                d['u'] = u
+                d['_prev_step'] = n
+            # Evaluated on every call, as Static.y
+            return g(d['x'], d['u'])
+    return __call__
+
+
+def _normal_order(block, simulator, d, ratio):
+    f, g = block.f, block.g
+    if ratio == 1:
+        def __call__(self, u):
+            d['u'] = u
+            x = d['x'] = f(d['x'], u)
+            y = d['y'] = g(x, u)
+            d['_prev_step'] = simulator.current_step
+            return y
+    else:
+        def __call__(self, u):
+            n = simulator.current_step
+            if n - d['_prev_step'] >= ratio:
+                d['u'] = u
+                x = d['x'] = f(d['x'], u)
+                d['y'] = g(x, u)
+                d['_prev_step'] = n
+            return d['y']
+    return __call__
+
+
+def _reverse_order(block, simulator, d, ratio):
+    f, g = block.f, block.g
+    if ratio == 1:
+        def __call__(self, u):
+            d['u'] = u
+            y = d['y'] = g(d['x'], u)
+            d['x'] = f(d['x'], u)
+            d['_prev_step'] = simulator.current_step
+            return y
+    else:
+        def __call__(self, u):
+            n = simulator.current_step
+            if n - d['_prev_step'] >= ratio:
+                d['u'] = u
+                d['y'] = g(d['x'], u)
+                d['x'] = f(d['x'], u)
+                d['_prev_step'] = n
+            return d['y']
+    return __call__
+
+
+_kinds = ((Static, _static), (NormalOrder, _normal_order),
+          (ReverseOrder, _reverse_order))
+
+
+def _build(block):
+    """Generate the step method of a specialized block"""
+    for kind, build in _kinds:
+        if isinstance(block, kind):
+            type(block).__call__ = build(
+                block, block._simulator, block.__dict__,
+                block._sample_time_ratio)
+
+
+def _validate(self, names=None):
+    self._base.validate(self, names)
+    _build(self)
+
+
+def specialize(block):
+    """Replace the class of a discrete block by a specialized subclass
+
+    The step method of the subclass has the sample time ratio, the
+    block methods and the block namespace bound, skips the sample hit
+    test when the block runs at the simulation rate and writes its
+    state without Block.__setattr__. Outputs are computed exactly as
+    by the base class, so results do not change. The method is
+    generated again whenever the block is validated, e.g. after live
+    parameter updates.
+
+    """
+    if not any(isinstance(block, kind) for kind, _ in _kinds):
+        return
+    base = getattr(type(block), '_base', type(block))
+    cls = type(base.__name__, (base, ),
+               dict(_base=base, validate=_validate,
+                    __module__=base.__module__))
+    object.__setattr__(block, '__class__', cls)
+    _build(block)
+
+
+def restore(block):
+    """Undo specialize()"""
+    if hasattr(type(block), '_base'):
+        object.__setattr__(block, '__class__', type(block)._base)
+
+
+def trace(simulator):
+    """Return a log function compiled on the first logged step
+
+    The layout of the signals returned by signal_flow is recorded on
+    the first call. The compiled function writes the signals directly
+    into the columns of the results buffer, held signals by
+    broadcasting, and only falls back to Simulator._log when the
+    layout changes or the fields are not all float64.
+
+    """
+    fallback = type(simulator)._log.__get__(simulator)
+
+    def log(data):
+        simulator._log = _compile(simulator, data, fallback)
+        simulator._log(data)
+
+    return log
+
+
+def _compile(simulator, data, fallback):
+
+    columns, dtype, held, rows = [], [], [], None
+    k = 0
+    for i, (value, fields) in enumerate(data):
+        fields = np.dtype(fields)
+        if any(fields[j] != np.float64 for j in range(len(fields))) \
+           or fields.itemsize != 8 * len(fields):
+            return fallback
+        if np.ndim(value) == 2:
+            if rows is None:
+                rows = i
+        else:
+            held += fields.names
+        columns.append(slice(k, k + len(fields)))
+        dtype += fields.descr
+        k += len(fields)
+    if rows is None:
+        return fallback
+    dtype = np.dtype(dtype)
+    n = len(data)
+    if simulator._held is None:
+        simulator._held = tuple(held)
+    state = dict(data=None)
+
+    def log(data):
+
+        recorder = simulator.recorder
+        if len(data) != n or hasattr(recorder, 'log'):
+            return fallback(data)
+        values = [np.asarray(value) for value, fields in data]
+        m = len(values[rows])
+
+        if recorder is None:
+            # Expand results buffer if necessary, see Simulator._store
+            offset = simulator._offset
+            if simulator.data is None:
+                simulator._chunk = max(simulator._chunk, 100*m)
+                simulator.data = np.empty(simulator._chunk, dtype)
+            elif len(simulator.data) < offset + m:
+                simulator.data = np.append(
+                    simulator.data,
+                    np.empty(simulator._chunk, simulator.data.dtype))
+            if state['data'] is not simulator.data:
+                if simulator.data.dtype != dtype:
+                    return fallback(data)
+                state['data'] = simulator.data
+                state['matrix'] = simulator.data.view(np.float64).reshape(
+                    len(simulator.data), k)
+            out = state['matrix'][offset:offset+m]
+        else:
+            out = np.empty((m, k))
+
+        try:
+            for column, value in zip(columns, values):
+                out[:, column] = value
+        except ValueError:
+            # Signal shapes changed
+            return fallback(data)
+        out = out.view(dtype)[:, 0]
+
+        for condition in simulator.stop_conditions:
+            last = condition(simulator, out)
+            if last is not None:
+                out = out[:last+1]
+                simulator.stop_reason = condition.reason
+                break
+
+        if recorder is None:
+            simulator._offset += len(out)
+        else:
+            recorder.append(out)
+
+    return log
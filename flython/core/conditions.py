@@ -0,0 +1,58 @@
+import numpy as np
+
+
+class StopCondition:
+    """Stop condition evaluated on the rows logged in each step
+
+    The predicate is called as predicate(simulator, rows) and returns
+    either a single bool or a bool per row. In the latter case rows
+    following the first offending one are discarded. Block states are
+    available through simulator.model, e.g. simulator.model.vehicle.x.
+
+    """
+
+    def __init__(self, predicate, reason):
+        self.predicate = predicate
+        self.reason = reason
+
+    def __call__(self, simulator, rows):
+        """Return index of the last row to keep or None"""
+
+        hit = np.asarray(self.predicate(simulator, rows))
+        if hit.ndim == 0:
+            return len(rows) - 1 if hit else None
+        hit = np.flatnonzero(hit)
+        return hit[0] if len(hit) else None
+
+    def __repr__(self):
+        return '{}({!r})'.format(self.__class__.__name__, self.reason)
+
+
+def below(field, level, reason=None):
+    """Stop when field drops below level, e.g. the vehicle hits the ground"""
+    return StopCondition(lambda simulator, rows: rows[field] < level,
+                         reason or '{} below {:g}'.format(field, level))
+
+
+def above(field, level, reason=None):
+    """Stop when field exceeds level"""
+    return StopCondition(lambda simulator, rows: rows[field] > level,
+                         reason or '{} above {:g}'.format(field, level))
+
+
+def diverged(field, bound, reason=None):
+    """Stop when absolute value of field exceeds bound"""
+    return StopCondition(lambda simulator, rows: np.abs(rows[field]) > bound,
+                         reason or '{} diverged'.format(field))
+
+
+def nan(*fields, reason=None):
+    """Stop when any of the fields (all by default) is NaN"""
+
+    def predicate(simulator, rows):
+        hit = np.zeros(len(rows), bool)
+        for field in fields or rows.dtype.names:
+            hit |= np.isnan(rows[field])
+        return hit
+
+    return StopCondition(predicate, reason or 'NaN')
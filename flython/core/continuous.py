@@ -1,4 +1,6 @@
+import numpy as np
 import scipy.integrate
+import scipy.optimize
 
 from .block import Block
 
@@ -6,7 +8,19 @@ w1 = "Solver failed, t={:g}, max_step={:g}."
 
 
 class Continuous(Block):
-    """Base class for continuous models"""
+    """Base class for continuous models
+
+    Blocks may declare zero-crossing event functions by listing their
+    method names in `_events`. Each method is called as event(t, x),
+    an optional `direction` attribute of the method selects rising (1)
+    or falling (-1) crossings only, as for scipy.integrate.solve_ivp.
+    The integration stops exactly at the event and the simulator
+    evaluates the model there, with a sample hit of all discrete
+    blocks, before resuming up to the major step.
+
+    """
+
+    _events = ()
 
     @property
     def y(self):
@@ -20,26 +34,82 @@ class Continuous(Block):
         # Prepare empty lists for solver results
         T = []
         X = []
+        # Create solver instance
+        if not hasattr(self, '_solver'):
+            self._create_solver(self._simulator.t_beg, self.x)
         # Run solver (up to the time point t) and store the results
         try:
-            t = self._simulator.t
+            # Integrate up to the major step, the simulator time is the
+            # event time when the model is evaluated at an event
+            s = self._simulator
+            t = s.t_beg + s.current_step * s.sample_time
             while self._solver.t < t:
                 self._solver.max_step = t - self._solver.t
+                t_old = self._solver.t
                 self._solver.step()
+                if self._events and self._locate_event(t_old, t):
+                    # Stop at the event, the solver was restarted there
+                    T.append((self._solver.t, ))
+                    X.append(self._solver.y)
+                    break
                 T.append((self._solver.t, ))
                 X.append(self._solver.y)
             self.x = self._solver.y
-        except AttributeError:
-            # Create solver instance
-            solver = getattr(scipy.integrate, self._simulator.solver)
-            self._solver = solver(self.f,
-                                  self._simulator.t_beg,
-                                  self.x,
-                                  self._simulator.t_end)
-            T, X = self.__call__(u)
         except RuntimeError:
             self._solver.status = 'running'
-            self._simulator.warn(
-                w1.format(self._solver.t, self._solver.max_step))
+            self._simulator.warn(w1, self._solver.t, self._solver.max_step)
 
         return T, X
+
+    def _create_solver(self, t0, x0):
+        solver = getattr(scipy.integrate, self._simulator.solver)
+        self._solver = solver(self.f, t0, x0, self._simulator.t_end)
+        if self._events:
+            self._g = self._event_values(t0, x0)
+
+    def _event_values(self, t, x):
+        return np.array([getattr(self, e)(t, x) for e in self._events])
+
+    def _locate_event(self, t_old, t):
+        """Locate the earliest event in the last solver step
+
+        When found, the solver is restarted at the event, which is
+        reported to the simulator, and True is returned.
+
+        """
+
+        t_new = self._solver.t
+        g_old, g_new = self._g, self._event_values(t_new, self._solver.y)
+        crossed = (g_old * g_new < 0) | ((g_new == 0) & (g_old != 0))
+        for k, e in enumerate(self._events):
+            direction = getattr(getattr(self, e), 'direction', 0)
+            if direction and np.sign(g_new[k] - g_old[k]) != direction:
+                crossed[k] = False
+        if not crossed.any():
+            self._g = g_new
+            return False
+
+        # Find roots using the dense output of the last step
+        dense = self._solver.dense_output()
+        t_event, k_event = t_new, None
+        for k in np.flatnonzero(crossed):
+            event = getattr(self, self._events[k])
+            if g_new[k] == 0:
+                root = t_new
+            else:
+                root = scipy.optimize.brentq(
+                    lambda s: event(s, dense(s)), t_old, t_new)
+            if root <= t_event:
+                t_event, k_event = root, k
+        if t_event >= t:
+            # Event at the major step, nothing to stop for
+            self._g = g_new
+            return False
+
+        # Restart solver at the event, the event function value there
+        # is treated as zero so the crossing is not detected again
+        x_event = dense(t_event)
+        self._create_solver(t_event, x_event)
+        self._g[k_event] = 0
+        self._simulator.event(self, self._events[k_event], t_event)
+        return True
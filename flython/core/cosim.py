@@ -0,0 +1,168 @@
+import multiprocessing
+import numpy as np
+
+from multiprocessing import shared_memory
+
+# Server commands
+STEP = 1
+RUN_UNTIL = 2
+STOP = 3
+# Server replies
+READY = 0
+FAILED = -1
+
+
+def _serve(model, inputs, outputs, model_block_parameters,
+           name, request, reply, errors):
+    """Server process main loop"""
+
+    from .. import defaults
+    from .settings import SimulationSettings
+    from .simulator import Simulator
+
+    shm = shared_memory.SharedMemory(name)
+    buf = np.ndarray(2 + len(inputs) + len(outputs), float, shm.buf)
+    control, u, y = buf[:2], buf[2:2+len(inputs)], buf[2+len(inputs):]
+
+    try:
+        sim = Simulator(model, SimulationSettings(defaults),
+                        **model_block_parameters)
+        if sim.status == 'failed':
+            raise FileNotFoundError("Model '{}' not found".format(model))
+        sim.observer = 'headless'
+        for k, v in zip(inputs, u):
+            setattr(sim.model, k, v)
+        sim._start()
+        control[:] = READY, sim.t
+    except Exception as exc:
+        errors.send("{}: {}".format(type(exc).__name__, exc))
+        control[0] = FAILED
+    reply.release()
+
+    while control[0] != FAILED:
+        request.acquire()
+        command = control[0]
+        if command == STOP:
+            break
+        try:
+            if command == STEP:
+                last_step = sim.current_step + 1
+            else:
+                last_step = round((control[1] - sim.t_beg) / sim.sample_time)
+            last_step = min(last_step, sim.total_number_of_steps)
+            # Pass inputs as model attributes
+            for k, v in zip(inputs, u):
+                setattr(sim.model, k, v)
+            if sim.status != 'finished' and last_step > sim.current_step:
+                # Only the rows of the current call are kept
+                sim._offset = 0
+                sim.status = 'running until'
+                sim._sim(last_step)
+                row = sim.data[sim._offset-1]
+                for i, k in enumerate(outputs):
+                    y[i] = row[k]
+            control[:] = READY, sim.t
+        except Exception as exc:
+            errors.send("{}: {} at t={}".format(type(exc).__name__, exc, sim.t))
+            control[0] = FAILED
+        reply.release()
+
+    del control, u, y, buf
+    shm.close()
+
+
+class StepServer:
+    """Co-simulation step server
+
+    The model is simulated in a separate, silent process and driven
+    with do_step() / run(t_stop) calls. Input and output vectors are
+    exchanged through a shared memory buffer and each call is a pair
+    of semaphore operations, nothing is pickled per step.
+
+    Before each call the values of `u` are assigned to the model module
+    attributes named in `inputs`, so signal_flow can read them as
+    globals. After the call `y` holds the fields named in `outputs` of
+    the last row logged by the model; calls advancing no step leave it
+    unchanged.
+
+    """
+
+    def __init__(self, model, inputs, outputs, **model_block_parameters):
+
+        self.inputs = tuple(inputs)
+        self.outputs = tuple(outputs)
+
+        n = 2 + len(self.inputs) + len(self.outputs)
+        self._shm = shared_memory.SharedMemory(create=True, size=8*n)
+        buf = np.ndarray(n, float, self._shm.buf)
+        buf[:] = 0
+        self._control = buf[:2]
+        self.u = buf[2:2+len(self.inputs)]
+        self.y = buf[2+len(self.inputs):]
+
+        self._request = multiprocessing.Semaphore(0)
+        self._reply = multiprocessing.Semaphore(0)
+        self._errors, errors = multiprocessing.Pipe(duplex=False)
+        self._process = multiprocessing.Process(
+            target=_serve,
+            args=(str(model), self.inputs, self.outputs,
+                  model_block_parameters, self._shm.name,
+                  self._request, self._reply, errors),
+            daemon=True)
+
+    @property
+    def t(self):
+        """Current simulation time of the server"""
+        return self._control[1]
+
+    def start(self):
+        self._process.start()
+        self._wait()
+        return self
+
+    def do_step(self, u=None):
+        """Perform a single major step, return output vector view"""
+        return self._call(STEP, u)
+
+    def run(self, t_stop, u=None):
+        """Run until t_stop with inputs held, return output vector view"""
+        self._control[1] = t_stop
+        return self._call(RUN_UNTIL, u)
+
+    def _call(self, command, u):
+        self._send(command, u)
+        self._wait()
+        return self.y
+
+    def _send(self, command, u=None, t_stop=None):
+        """Send a command without waiting for the reply, see _wait()"""
+        if u is not None:
+            self.u[:] = u
+        if t_stop is not None:
+            self._control[1] = t_stop
+        self._control[0] = command
+        self._request.release()
+
+    def _wait(self):
+        self._reply.acquire()
+        if self._control[0] == FAILED:
+            raise RuntimeError(self._errors.recv())
+
+    def close(self):
+        if self._process.is_alive():
+            self._control[0] = STOP
+            self._request.release()
+        self._process.join()
+        del self._control, self.u, self.y
+        try:
+            self._shm.close()
+        except BufferError:
+            # Output views still referenced by the caller
+            pass
+        self._shm.unlink()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *args):
+        self.close()
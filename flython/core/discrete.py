@@ -1,8 +1,13 @@
+import copy
+import numpy as np
+
 from .block import Block
 
 
 class Discrete(Block):
 
+    _depends = ('sample_time', )
+
     def _validate(self):
         """Block validation method run by the simulation manager"""
 
@@ -18,7 +23,22 @@ class Discrete(Block):
 
         self._sample_time_ratio = round(
             self.sample_time / self._simulator.sample_time)
-        self._prev_step = -self._sample_time_ratio
+        # Sample hit timing is kept when revalidated during a session
+        if self._simulator.status == 'starting':
+            self._prev_step = -self._sample_time_ratio
+
+    def replay(self, u_series):
+        """Return the outputs for a series of inputs, one per sample hit
+
+        Runs open loop, without a simulation, from the current state.
+        A block not validated yet, e.g. of a freshly loaded model, is
+        validated first to resolve its sample time and derived data.
+        Blocks implement it in _replay().
+
+        """
+        if '_sample_time_ratio' not in self.__dict__:
+            self.validate()
+        return self._replay(u_series)
 
 
 class Static(Discrete):
@@ -37,6 +57,11 @@ class Static(Discrete):
     def y(self):
         return self.g(self.x, self.u)
 
+    def _replay(self, u_series):
+        """Evaluate g for every input, blocks with a vectorized g
+        override it"""
+        return np.array([self.g(self.x, u) for u in u_series])
+
 
 class NormalOrder(Discrete):
 
@@ -52,6 +77,14 @@ class NormalOrder(Discrete):
 
         return self.y
 
+    def _replay(self, u_series):
+        """Step a copy of the state, the block state is not changed"""
+        x, y = copy.deepcopy(self.x), []
+        for u in u_series:
+            x = self.f(x, u)
+            y.append(copy.copy(self.g(x, u)))
+        return np.array(y)
+
 
 class ReverseOrder(Discrete):
 
@@ -66,3 +99,11 @@ class ReverseOrder(Discrete):
             self._prev_step = self._simulator.current_step
 
         return self.y
+
+    def _replay(self, u_series):
+        """Step a copy of the state, the block state is not changed"""
+        x, y = copy.deepcopy(self.x), []
+        for u in u_series:
+            y.append(copy.copy(self.g(x, u)))
+            x = self.f(x, u)
+        return np.array(y)
@@ -0,0 +1,131 @@
+import multiprocessing
+import numpy as np
+
+from multiprocessing import shared_memory
+
+from .. import defaults
+from .settings import SimulationSettings
+from .simulator import Simulator
+
+
+class GridRecorder:
+    """Record the last row of every major step into a given array
+
+    The array row n-1 holds the results at t_beg + n * sample_time, so
+    runs of the same model share a common time grid.
+
+    """
+
+    def __init__(self, simulator, out):
+        self._simulator = simulator
+        self.out = out
+
+    def append(self, rows):
+        self.out[self._simulator.current_step - 1] = rows[-1]
+
+    def result(self):
+        return self.out[:self._simulator.current_step]
+
+
+def load(model, **model_block_parameters):
+    """Load a model with the silent observer"""
+
+    simulator = Simulator(model, SimulationSettings(defaults),
+                          **model_block_parameters)
+    simulator.observer = 'headless'
+    return simulator
+
+
+def schema(model, **model_block_parameters):
+    """Return output dtype and number of steps of a model"""
+
+    simulator = load(model, **model_block_parameters)
+    simulator.step()
+    return simulator.data.dtype, simulator.total_number_of_steps
+
+
+# Worker process state
+_model = None
+_results = None
+_shm = None
+
+
+def _attach(model, name, path, dtype, shape):
+    global _model, _results, _shm
+    _model = model
+    if path is None:
+        _shm = shared_memory.SharedMemory(name)
+        _results = np.ndarray(shape, dtype, _shm.buf)
+    else:
+        _results = np.load(path, mmap_mode='r+')
+
+
+def _run_case(case):
+    i, parameters = case
+    simulator = load(_model, **parameters)
+    simulator.recorder = GridRecorder(simulator, _results[i])
+    simulator.run()
+    return i, simulator.current_step
+
+
+class Ensemble:
+    """Multi-process ensemble of simulation runs
+
+    Each case is a dict of model block parameters, see flython.load.
+    Results are written by the worker processes in place, each run into
+    its own row of a (runs x steps) structured array allocated in
+    shared memory or, when path is given, in a memory-mapped .npy file.
+    Rows hold the results at the major steps only.
+
+    """
+
+    def __init__(self, model, cases, path=None):
+
+        self.model = str(model)
+        self.cases = list(cases)
+        self.path = path
+
+        # Size storage from the output schema of the model
+        dtype, steps = schema(self.model, **self.cases[0])
+        shape = (len(self.cases), steps)
+        if path is None:
+            self._shm = shared_memory.SharedMemory(
+                create=True, size=max(1, dtype.itemsize * shape[0] * shape[1]))
+            self.data = np.ndarray(shape, dtype, self._shm.buf)
+        else:
+            self._shm = None
+            self.data = np.lib.format.open_memmap(path, 'w+', dtype, shape)
+        # Number of completed steps per run
+        self.completed = np.zeros(shape[0], int)
+
+    def run(self, processes=None):
+        """Run all cases, return (runs x steps) view of the results"""
+
+        name = self._shm.name if self._shm is not None else None
+        initargs = (self.model, name, self.path,
+                    self.data.dtype, self.data.shape)
+        with multiprocessing.Pool(processes, _attach, initargs) as pool:
+            for i, steps in pool.imap_unordered(
+                    _run_case, enumerate(self.cases)):
+                self.completed[i] = steps
+        if self._shm is None:
+            self.data.flush()
+        return self.data
+
+    def close(self):
+        """Release the shared memory, results are no longer available"""
+
+        del self.data
+        if self._shm is not None:
+            try:
+                self._shm.close()
+            except BufferError:
+                # Views still referenced by the caller
+                pass
+            self._shm.unlink()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
@@ -1,5 +1,11 @@
+import atexit
 import logging
+import logging.handlers
 import os
+import queue
+import time
+
+repeated = " [{} similar messages suppressed]"
 
 # Create logger
 logger = logging.getLogger('FLYTHON LOG')
@@ -7,6 +13,128 @@ logger.setLevel(logging.DEBUG)
 # handlers instaces
 fh = NotImplemented
 ch = NotImplemented
+# Log file location, see log_file()
+path = os.environ.get('FLYTHON_LOG') or os.path.join(
+    os.path.expanduser('~'), '.cache', 'flython', 'flython.log')
+
+
+class RateLimiter:
+    """Deduplication of repeated messages
+
+    Messages are keyed by their template. The first `burst` messages of
+    a template are let through, later ones at most once per `interval`
+    seconds, reporting the number suppressed in between. Total numbers
+    of messages per template are kept in `counts`.
+
+    """
+
+    def __init__(self, burst=3, interval=1.):
+        self.burst = burst
+        self.interval = interval
+        self.counts = {}
+        self._state = {}
+
+    def __call__(self, key):
+        """Return (let through, number suppressed since the last one)"""
+
+        count = self.counts.get(key, 0) + 1
+        self.counts[key] = count
+        if count <= self.burst:
+            return True, 0
+        now = time.monotonic()
+        state = self._state.get(key)
+        if state is None:
+            state = self._state[key] = [now + self.interval, 0]
+        if now < state[0]:
+            state[1] += 1
+            return False, 0
+        suppressed = state[1]
+        state[:] = now + self.interval, 0
+        return True, suppressed
+
+    def pending(self):
+        """Return numbers of suppressed messages not reported yet"""
+        return {key: state[1] for key, state in self._state.items()
+                if state[1]}
+
+    def reset(self):
+        self.counts.clear()
+        self._state.clear()
+
+
+class Deduplicate(logging.Filter):
+    """Rate limiting filter of log records, see RateLimiter"""
+
+    def __init__(self, burst=3, interval=1.):
+        super().__init__()
+        self.limiter = RateLimiter(burst, interval)
+
+    def filter(self, record):
+        show, suppressed = self.limiter((record.levelno, record.msg))
+        if show and suppressed:
+            record.msg = record.getMessage() + repeated.format(suppressed)
+            record.args = ()
+        return show
+
+
+class QueueHandler(logging.handlers.QueueHandler):
+    """Hand records over to the listener thread as they are
+
+    The queue does not leave the process, so records are formatted by
+    the listener rather than in the calling thread.
+
+    """
+
+    def prepare(self, record):
+        return record
+
+
+_queue = queue.SimpleQueue()
+qh = QueueHandler(_queue)
+qh.addFilter(Deduplicate())
+logger.addHandler(qh)
+listener = None
+
+
+def _restart():
+    """Restart the listener thread with the current handlers"""
+
+    global listener
+
+    if listener is not None:
+        listener.stop()
+    handlers = [h for h in (fh, ch) if h is not NotImplemented]
+    listener = logging.handlers.QueueListener(
+        _queue, *handlers, respect_handler_level=True)
+    listener.start()
+
+
+def _stop():
+    if listener is not None:
+        # Report messages still suppressed
+        for (level, msg), n in qh.filters[0].limiter.pending().items():
+            logger.log(level, "%s" + repeated.format(n), msg)
+        listener.stop()
+
+
+atexit.register(_stop)
+
+
+def log_file(location):
+    """Set log file location, default ~/.cache/flython/flython.log or
+    the FLYTHON_LOG environment variable"""
+
+    global fh, listener, path
+
+    path = os.path.expanduser(location or path)
+    if fh is not NotImplemented:
+        # Write pending records before the file is switched
+        listener.stop()
+        listener = None
+        level = fh.level
+        fh.close()
+        fh = NotImplemented
+        file_logger(logging.getLevelName(level))
 
 
 def file_logger(level):
@@ -15,9 +143,11 @@ def file_logger(level):
 
     # create file handler and set level to debug
     if fh is NotImplemented:
-        fh = logging.FileHandler(os.path.dirname(__file__) + '/' + 'flython.log')
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        fh = logging.FileHandler(path, delay=True)
         fh.setFormatter(logging.Formatter('%(asctime)s %(message)s'))
-        logger.addHandler(fh)
+        fh.setLevel(getattr(logging, level.upper()))
+        _restart()
     fh.setLevel(getattr(logging, level.upper()))
 
 
@@ -29,5 +159,6 @@ def console_logger(level):
     if ch is NotImplemented:
         ch = logging.StreamHandler()
         ch.setFormatter(logging.Formatter('%(name)s: %(message)s'))
-        logger.addHandler(ch)
+        ch.setLevel(getattr(logging, level.upper()))
+        _restart()
     ch.setLevel(getattr(logging, level.upper()))
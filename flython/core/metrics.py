@@ -0,0 +1,160 @@
+import numpy as np
+
+
+class Reduction:
+    """In-loop reduction of a logged signal, the base class keeps the
+    last value
+
+    The signal is a field name or a callable returning the signal
+    given the rows logged in a step. Subclasses accumulate the samples
+    in update() and start over in reset().
+
+    """
+
+    def __init__(self, signal):
+        self.signal = signal
+        self.reset()
+
+    def reset(self):
+        self._value = np.nan
+
+    def __call__(self, rows):
+        if callable(self.signal):
+            self.update(rows['t'], np.asarray(self.signal(rows), float))
+        else:
+            self.update(rows['t'], rows[self.signal])
+
+    def update(self, t, x):
+        self._value = x[-1]
+
+    @property
+    def value(self):
+        return self._value
+
+
+class Sum(Reduction):
+
+    def reset(self):
+        self._value = 0.
+
+    def update(self, t, x):
+        self._value += x.sum()
+
+
+class SumOfSquares(Reduction):
+
+    def reset(self):
+        self._value = 0.
+
+    def update(self, t, x):
+        self._value += x.dot(x)
+
+
+class Min(Reduction):
+
+    def reset(self):
+        self._value = np.inf
+
+    def update(self, t, x):
+        self._value = min(self._value, x.min())
+
+
+class Max(Reduction):
+
+    def reset(self):
+        self._value = -np.inf
+
+    def update(self, t, x):
+        self._value = max(self._value, x.max())
+
+
+class Integral(Reduction):
+    """Trapezoidal integral over time"""
+
+    def reset(self):
+        self._value = 0.
+        self._t0 = None
+        self._prev = None
+
+    def update(self, t, x):
+        if self._prev is not None:
+            t = np.concatenate(((self._prev[0],), t))
+            x = np.concatenate(((self._prev[1],), x))
+        else:
+            self._t0 = t[0]
+        self._value += np.dot(np.diff(t), 0.5 * (x[1:] + x[:-1]))
+        self._prev = t[-1], x[-1]
+
+
+class RMS(Integral):
+    """Root mean square over time"""
+
+    def update(self, t, x):
+        super().update(t, x * x)
+
+    @property
+    def value(self):
+        if self._prev is None or self._prev[0] == self._t0:
+            return np.nan
+        return np.sqrt(self._value / (self._prev[0] - self._t0))
+
+
+class Crossing(Reduction):
+    """Time of the first crossing of the given level, NaN if none"""
+
+    def __init__(self, signal, level=0.):
+        self.level = level
+        super().__init__(signal)
+
+    def reset(self):
+        self._value = np.nan
+        self._prev = None
+
+    def update(self, t, x):
+        if self._value == self._value:
+            # Already crossed
+            return
+        if self._prev is not None:
+            t = np.concatenate(((self._prev[0],), t))
+            x = np.concatenate(((self._prev[1],), x))
+        e = x - self.level
+        i = np.flatnonzero(e[:-1] * e[1:] <= 0)
+        i = i[(e[i] != 0) | (e[i+1] != 0)]
+        if len(i):
+            # Linear interpolation of the crossing
+            i = i[0]
+            self._value = t[i] + (t[i+1] - t[i]) * e[i] / (e[i] - e[i+1])
+        self._prev = t[-1], x[-1]
+
+
+operations = dict(sum=Sum, sumsq=SumOfSquares, min=Min, max=Max,
+                  last=Reduction, integral=Integral, rms=RMS,
+                  crossing=Crossing)
+
+
+class Metrics:
+    """Recorder updating reductions in the step loop, rows are not kept
+
+    Reductions are given as name=(operation, signal[, level]), where
+    operation is one of the keys of `operations`, e.g.
+
+        Metrics(alt_rms=('rms', lambda rows: rows['z'] - rows['zr']),
+                q_max=('max', 'q'), t_settle=('crossing', 'theta', 0.02))
+
+    """
+
+    def __init__(self, **reductions):
+        # Operations by name, see Simulator.run_metrics
+        self.specs = {name: spec[0] for name, spec in reductions.items()}
+        self.reductions = {
+            name: operations[spec[0]](*spec[1:])
+            for name, spec in reductions.items()}
+        self._update = tuple(self.reductions.values())
+
+    def append(self, rows):
+        for reduction in self._update:
+            reduction(rows)
+
+    def result(self):
+        return {name: reduction.value
+                for name, reduction in self.reductions.items()}
@@ -0,0 +1,204 @@
+import multiprocessing
+import numpy as np
+
+from numpy.lib import recfunctions
+
+from .ensemble import GridRecorder, load, schema
+
+
+class Moments:
+    """Streaming mean, variance and min/max envelope (Welford)"""
+
+    def __init__(self, shape):
+        self.count = 0
+        self.mean = np.zeros(shape)
+        self._m2 = np.zeros(shape)
+        self.min = np.full(shape, np.inf)
+        self.max = np.full(shape, -np.inf)
+
+    def update(self, x):
+        self.count += 1
+        delta = x - self.mean
+        self.mean += delta / self.count
+        self._m2 += delta * (x - self.mean)
+        np.minimum(self.min, x, out=self.min)
+        np.maximum(self.max, x, out=self.max)
+
+    @property
+    def variance(self):
+        """Sample variance"""
+        if self.count < 2:
+            return np.full(self.mean.shape, np.nan)
+        return self._m2 / (self.count - 1)
+
+
+class Quantiles:
+    """Streaming quantile sketch, the P-square algorithm
+
+    Every cell of the observed array keeps five markers per quantile,
+    so memory does not depend on the number of observations. See Jain
+    and Chlamtac, "The P2 algorithm for dynamic calculation of
+    quantiles and histograms without storing observations", 1985.
+
+    """
+
+    def __init__(self, shape, probabilities):
+        self.shape = shape
+        self.probabilities = np.asarray(probabilities, float)
+        self.count = 0
+        p = self.probabilities[:, None]
+        size = int(np.prod(shape))
+        # Marker heights, actual and desired positions (5, P, cells)
+        self._q = np.empty((5, len(p), size))
+        self._n = np.empty((5, len(p), size))
+        self._desired = np.stack(
+            np.broadcast_arrays(0*p, 2*p, 4*p, 2 + 2*p, 4 + 0*p))
+        self._increment = np.stack(
+            np.broadcast_arrays(0*p, p/2, p, (1 + p)/2, 1 + 0*p))
+
+    def update(self, x):
+        x = np.reshape(x, -1)
+        q, n = self._q, self._n
+        if self.count < 5:
+            q[self.count] = x
+            self.count += 1
+            if self.count == 5:
+                q.sort(axis=0)
+                n[:] = np.arange(5)[:, None, None]
+            return
+        self.count += 1
+
+        # Find cell k such that q[k] <= x < q[k+1], adjust extremes
+        np.minimum(q[0], x, out=q[0])
+        np.maximum(q[4], x, out=q[4])
+        k = (x >= q[1]).astype(int) + (x >= q[2]) + (x >= q[3])
+        # Increment positions of markers k+1 through 4
+        n[1:] += np.arange(1, 5)[:, None, None] > k
+        self._desired += self._increment
+
+        # Adjust heights of markers 1 through 3
+        for i in (1, 2, 3):
+            d = self._desired[i] - n[i]
+            move = ((d >= 1) & (n[i+1] - n[i] > 1)) | \
+                   ((d <= -1) & (n[i-1] - n[i] < -1))
+            if not move.any():
+                continue
+            d = np.where(move, np.sign(d), 0)
+            with np.errstate(divide='ignore', invalid='ignore'):
+                parabolic = q[i] + d / (n[i+1] - n[i-1]) * (
+                    (n[i] - n[i-1] + d) * (q[i+1] - q[i]) / (n[i+1] - n[i]) +
+                    (n[i+1] - n[i] - d) * (q[i] - q[i-1]) / (n[i] - n[i-1]))
+                j = np.where(d > 0, i + 1, i - 1)
+                qj = np.take_along_axis(q, j[None], 0)[0]
+                nj = np.take_along_axis(n, j[None], 0)[0]
+                linear = q[i] + d * (qj - q[i]) / (nj - n[i])
+            ok = (q[i-1] < parabolic) & (parabolic < q[i+1])
+            q[i] = np.where(move, np.where(ok, parabolic, linear), q[i])
+            n[i] += d
+
+    def quantiles(self):
+        """Return quantile estimates, shape (P,) + shape"""
+        if self.count < 5:
+            return np.quantile(self._q[:self.count, 0], self.probabilities,
+                               axis=0).reshape((-1,) + self.shape)
+        return self._q[2].reshape((-1,) + self.shape)
+
+
+# Worker process state
+_model = None
+_dtype = None
+_steps = None
+
+
+def _attach(model, dtype, steps):
+    global _model, _dtype, _steps
+    _model, _dtype, _steps = model, dtype, steps
+
+
+def _run_case(case):
+    seed, parameters = case
+    np.random.seed(seed)
+    simulator = load(_model, **parameters)
+    simulator.recorder = GridRecorder(simulator, np.empty(_steps, _dtype))
+    return simulator.run()
+
+
+class MonteCarlo:
+    """Monte Carlo study with streaming cross-run statistics
+
+    Runs are sampled on the common grid of major steps and folded into
+    online accumulators, then discarded, so memory stays O(steps x
+    signals) regardless of the number of runs. Fields are all logged
+    fields but 't' unless given.
+
+    """
+
+    def __init__(self, model, fields=None, percentiles=(5, 50, 95)):
+
+        self.model = str(model)
+        self.percentiles = tuple(percentiles)
+        self._fields = fields
+        self.runs = 0
+        self.t = None
+
+    def run(self, runs, processes=None, seed=0, **model_block_parameters):
+        """Perform runs with seeds seed, seed+1, ... and update statistics"""
+
+        dtype, steps = schema(self.model, **model_block_parameters)
+        cases = ((seed + i, model_block_parameters) for i in range(runs))
+        with multiprocessing.Pool(
+                processes, _attach, (self.model, dtype, steps)) as pool:
+            for data in pool.imap_unordered(_run_case, cases):
+                self.update(data)
+        return self
+
+    def update(self, data):
+        """Fold a single run sampled at the major steps into statistics"""
+
+        if self.t is None:
+            self.t = data['t'].copy()
+            if self._fields is None:
+                self._fields = [f for f in data.dtype.names if f != 't']
+            self.fields = tuple(self._fields)
+            self._dtype = [(f, '<f8') for f in self.fields]
+            shape = (len(self.t), len(self.fields))
+            self._moments = Moments(shape)
+            self._quantiles = Quantiles(
+                shape, np.array(self.percentiles) / 100)
+        x = recfunctions.structured_to_unstructured(
+            data[list(self.fields)], float)
+        self._moments.update(x)
+        self._quantiles.update(x)
+        self.runs += 1
+
+    def _structured(self, x):
+        out = np.empty(len(self.t), [('t', '<f8')] + self._dtype)
+        out['t'] = self.t
+        for i, f in enumerate(self.fields):
+            out[f] = x[:, i]
+        return out
+
+    @property
+    def mean(self):
+        return self._structured(self._moments.mean)
+
+    @property
+    def variance(self):
+        return self._structured(self._moments.variance)
+
+    @property
+    def std(self):
+        return self._structured(np.sqrt(self._moments.variance))
+
+    @property
+    def min(self):
+        return self._structured(self._moments.min)
+
+    @property
+    def max(self):
+        return self._structured(self._moments.max)
+
+    def percentile(self, q):
+        """Return percentile band q, one of the tracked percentiles"""
+        i = self.percentiles.index(q)
+        return self._structured(self._quantiles.quantiles()[i])
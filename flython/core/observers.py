@@ -0,0 +1,170 @@
+import os
+import warnings
+
+from timeit import default_timer as timer
+
+from .logger import logger
+
+# Event messages
+start_message = "Running '{}' with '{}' solver, " \
+                "for t in [{},{}], with step {}."
+failed = "Simulation broken. Try to reload a model."
+finished = "Simulation finished. Use reload()."
+simulation_completed = "\nSimulation completed. Total simulation time: {}."
+simulation_stopped = "\nSimulation stopped at t={}: {}. " \
+                     "Total simulation time: {}."
+run_until_ignored = "Run until t={} ignored. Simulation already at t={}."
+run_until_completed = "\nRun until t={} completed. Partial run time: {}."
+step_completed = "\nStep completed. Total step time: {}."
+progress_bar = "\rProgress: [{0:50s}] {1:.1f}%"
+
+
+def pretty(t):
+    """Format duraton time"""
+
+    whole, frac = (x for x in str("{:.6f}".format(t)).rsplit("."))
+    if whole != '0':
+        whole = float(whole)
+        if whole < 999.5:
+            return "{:.3g}s".format(t)
+        else:
+            return "{:.1f}s".format(t)
+    else:
+        frac = round(float("."+frac)*10**6)
+        if frac < 1000:
+            return "{:g}us".format(frac)
+        elif round(frac/1000) < 100:
+            return "{:.2g}ms".format(frac/1000)
+        elif round(frac/1000) < 1000:
+            return "{:.3g}ms".format(frac/1000)
+        else:
+            return "{:.4g}ms".format(frac/1000)
+
+
+class Observer:
+    """Base class for simulation observers, all events are ignored"""
+
+    def start(self, simulator):
+        """Simulation started"""
+
+    def progress(self, simulator):
+        """Major step completed, called once per step in the loop"""
+
+    def step_done(self, simulator, elapsed):
+        """Call to step() completed"""
+
+    def warning(self, simulator, message):
+        """Warning issued during the session"""
+
+    def finish(self, simulator, elapsed, t_stop=None):
+        """Call to run() or run(t_stop) completed"""
+
+    def notice(self, simulator, message):
+        """Status notice, e.g. simulation failed or already finished"""
+
+
+class Headless(Observer):
+    """Silent observer for batch, production and parallel runs
+
+    Warnings are not shown, they are written to the file log only.
+
+    """
+
+    def warning(self, simulator, message):
+        logger.info("Warning: " + message)
+
+
+class Terminal(Observer):
+    """Terminal renderer, progress bar is redrawn at most refresh_rate
+    times per second (every step when refresh_rate is None)"""
+
+    def __init__(self, refresh_rate=10):
+        self.refresh_rate = refresh_rate
+        self._period = 1 / refresh_rate if refresh_rate else 0
+        self._next_redraw = 0
+
+    def start(self, simulator):
+        self._next_redraw = 0
+        print(start_message.format(
+            os.path.basename(simulator.model.__file__), simulator.solver,
+            simulator.t_beg, simulator.t_end, simulator.sample_time))
+
+    def progress(self, simulator):
+        n = simulator.current_step
+        now = timer()
+        if now < self._next_redraw and n < simulator.total_number_of_steps:
+            return
+        self._next_redraw = now + self._period
+        c = 50 / simulator.total_number_of_steps
+        print(progress_bar.format('#' * int(n * c), n*2*c),
+              end="", flush=True)
+
+    def step_done(self, simulator, elapsed):
+        print(step_completed.format(pretty(elapsed)))
+
+    def warning(self, simulator, message):
+        if simulator.status in ('running', 'running until'):
+            message = "\x1b[2K\rWarning: " + message
+        elif simulator.status == 'step':
+            message = "\nWarning: " + message + "\033[F"
+        else:
+            message = "Warning: " + message
+        warnings.warn(message)
+
+    def finish(self, simulator, elapsed, t_stop=None):
+        if simulator.stop_reason is not None:
+            print(simulation_stopped.format(
+                simulator.t, simulator.stop_reason, pretty(elapsed)))
+        elif t_stop is None:
+            print(simulation_completed.format(pretty(elapsed)))
+        else:
+            print(run_until_completed.format(simulator.t, pretty(elapsed)))
+
+    def notice(self, simulator, message):
+        print(message)
+
+
+class Group(Observer):
+    """Forward events to several observers"""
+
+    def __init__(self, *observers):
+        self.observers = observers
+
+    def start(self, simulator):
+        for observer in self.observers:
+            observer.start(simulator)
+
+    def progress(self, simulator):
+        for observer in self.observers:
+            observer.progress(simulator)
+
+    def step_done(self, simulator, elapsed):
+        for observer in self.observers:
+            observer.step_done(simulator, elapsed)
+
+    def warning(self, simulator, message):
+        for observer in self.observers:
+            observer.warning(simulator, message)
+
+    def finish(self, simulator, elapsed, t_stop=None):
+        for observer in self.observers:
+            observer.finish(simulator, elapsed, t_stop)
+
+    def notice(self, simulator, message):
+        for observer in self.observers:
+            observer.notice(simulator, message)
+
+
+def create(observer, refresh_rate=None):
+    """Return an observer given its name, an instance or a sequence"""
+
+    if isinstance(observer, Observer):
+        return observer
+    elif isinstance(observer, (list, tuple)):
+        return Group(*(create(o, refresh_rate) for o in observer))
+    elif observer == 'terminal':
+        return Terminal(refresh_rate)
+    elif observer == 'headless':
+        return Headless()
+    else:
+        raise ValueError("Invalid observer: '{}'".format(observer))
@@ -0,0 +1,119 @@
+import numpy as np
+
+from .cosim import RUN_UNTIL
+
+
+class Partitioned:
+    """Co-simulation of subsystem models in parallel worker processes
+
+    Partitions are given as {name: cosim.StepServer}, each one a model
+    of a subsystem run in its own process. Connections map partition
+    inputs to outputs of other partitions, e.g.
+
+        {'vehicle.qr': 'autopilot.qr', 'autopilot.theta': 'vehicle.theta'}
+
+    The partitions advance in lockstep, exchanging the boundary signals
+    every sample_time seconds, or every rates[name] exchanges for the
+    partitions given in rates. With delay=1 the inputs are the outputs
+    of the previous exchange and all partitions run in parallel between
+    the barriers. With delay=0 the partitions run one after the other
+    in the given order, inputs from earlier partitions are then the
+    outputs of the current exchange. Outputs are zero before the first
+    exchange, unless given in initial as {'partition.output': value}.
+
+    """
+
+    def __init__(self, partitions, connections, sample_time, delay=1,
+                 rates=None, initial=None):
+        if delay not in (0, 1):
+            raise ValueError("Coupling delay must be 0 or 1 step.")
+        self.partitions = dict(partitions)
+        self.sample_time = sample_time
+        self.delay = delay
+        self.rates = {name: 1 for name in self.partitions}
+        self.rates.update(rates or {})
+
+        def locate(signal, kind):
+            name, field = signal.split('.', 1)
+            server = self.partitions[name]
+            return name, getattr(server, kind).index(field)
+
+        # Boundary signals as (input partition, input index,
+        # output partition, output index)
+        self._links = [locate(i, 'inputs') + locate(o, 'outputs')
+                       for i, o in connections.items()]
+        self.dtype = [('t', '<f8')] + [
+            ('{}.{}'.format(name, field), '<f8')
+            for name, server in self.partitions.items()
+            for field in server.outputs]
+        # Columns of the outputs of each partition in the results
+        self._columns, k = [], 1
+        for server in self.partitions.values():
+            self._columns.append((slice(k, k + len(server.outputs)),
+                                  server.y))
+            k += len(server.outputs)
+        self.initial = initial or {}
+        self.t = None
+
+    def start(self):
+        # Start all processes first, models are loaded in parallel
+        for server in self.partitions.values():
+            server._process.start()
+        for server in self.partitions.values():
+            server._wait()
+        for signal, value in self.initial.items():
+            name, field = signal.split('.', 1)
+            server = self.partitions[name]
+            server.y[server.outputs.index(field)] = value
+        self.t = max(server.t for server in self.partitions.values())
+        self._n = 0
+        return self
+
+    def _exchange(self, name):
+        server = self.partitions[name]
+        for i, k, o, j in self._links:
+            if i == name:
+                server.u[k] = self.partitions[o].y[j]
+
+    def run(self, t_stop):
+        """Run until t_stop, return the exchanged outputs"""
+
+        steps = round((t_stop - self.t) / self.sample_time)
+        data = np.empty(max(steps, 0), self.dtype)
+        rows = data.view(np.float64).reshape(len(data), len(self.dtype))
+        t0 = self.t
+        for m in range(steps):
+            self._n += 1
+            t = t0 + (m + 1) * self.sample_time
+            due = [name for name in self.partitions
+                   if not self._n % self.rates[name]]
+            if self.delay:
+                # Inputs of all partitions before any of them moves
+                for name in due:
+                    self._exchange(name)
+                for name in due:
+                    self.partitions[name]._send(RUN_UNTIL, t_stop=t)
+                # Barrier
+                for name in due:
+                    self.partitions[name]._wait()
+            else:
+                for name in due:
+                    self._exchange(name)
+                    self.partitions[name]._send(RUN_UNTIL, t_stop=t)
+                    self.partitions[name]._wait()
+            self.t = t
+            row = rows[m]
+            row[0] = t
+            for columns, y in self._columns:
+                row[columns] = y
+        return data
+
+    def close(self):
+        for server in self.partitions.values():
+            server.close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *args):
+        self.close()
@@ -0,0 +1,166 @@
+import asyncio
+import inspect
+import math
+import numpy as np
+
+from .observers import pretty
+
+
+class Latency:
+    """Per-step compute latency statistics of a paced run"""
+
+    def __init__(self, size=1024):
+        self._samples = np.empty(max(size, 1))
+        self.count = 0
+        self.overruns = 0
+        self.dropped = 0
+
+    def record(self, latency, overrun):
+        if self.count == len(self._samples):
+            self._samples = np.append(
+                self._samples, np.empty(len(self._samples)))
+        self._samples[self.count] = latency
+        self.count += 1
+        self.overruns += overrun
+
+    @property
+    def samples(self):
+        return self._samples[:self.count]
+
+    def percentile(self, q):
+        return np.percentile(self.samples, q) if self.count else np.nan
+
+    @property
+    def p50(self):
+        return self.percentile(50)
+
+    @property
+    def p99(self):
+        return self.percentile(99)
+
+    @property
+    def max(self):
+        return self.samples.max() if self.count else np.nan
+
+    def histogram(self, bins=50):
+        """Return latency histogram as (counts, bin_edges)"""
+        return np.histogram(self.samples, bins)
+
+    def __repr__(self):
+        if not self.count:
+            return "Latency(no steps)"
+        return "Latency(p50={}, p99={}, max={}, overruns={}/{})".format(
+            pretty(self.p50), pretty(self.p99), pretty(self.max),
+            self.overruns, self.count)
+
+
+class _Tap:
+    """Recorder wrapper keeping the rows passed on in the current step"""
+
+    def __init__(self, simulator):
+        self._simulator = simulator
+        self.recorder = simulator.recorder
+        self.rows = []
+        if hasattr(self.recorder, 'log'):
+            self.log = self._log
+
+    def _log(self, data):
+        # Rows are built after the recorder took the signals
+        self.recorder.log(data)
+        self.rows.append(self._simulator._rows(data))
+
+    def append(self, rows):
+        self.recorder.append(rows)
+        self.rows.append(rows)
+
+    def result(self):
+        return self.recorder.result()
+
+    def pop(self):
+        rows, self.rows = self.rows, []
+        return rows[0] if len(rows) == 1 else np.concatenate(rows)
+
+
+async def _publish(queue, sink):
+    """Forward logged rows to the sink outside of the step loop"""
+
+    while True:
+        rows = await queue.get()
+        if hasattr(sink, 'write'):
+            # asyncio.StreamWriter, e.g. of a UNIX socket connection
+            sink.write(rows.tobytes())
+            await sink.drain()
+        else:
+            result = sink(rows)
+            if inspect.isawaitable(result):
+                await result
+        queue.task_done()
+
+
+async def pace(simulator, last_step, rt_factor=1, sink=None, queue_size=64):
+    """Advance the simulator in lockstep with the wall-clock time
+
+    Step n is released at t0 + (n - 1) * sample_time / rt_factor and
+    has to be computed before the release of the next step, otherwise
+    it is counted as a deadline overrun. A late step is not skipped,
+    the following steps are released immediately until the schedule
+    is caught up. Rows logged in each step are passed to the sink
+    (callable, coroutine function or asyncio.StreamWriter) through a
+    bounded queue; when the sink can not keep up, rows are dropped
+    rather than blocking the step loop. With last_step infinite the
+    run goes on until a stop condition holds or the task is cancelled.
+
+    """
+
+    loop = asyncio.get_running_loop()
+    period = simulator.sample_time / rt_factor
+    first_step = simulator.current_step
+    # Open-ended runs go on until stopped, samples grow as needed
+    latency = Latency(1024 if math.isinf(last_step)
+                      else last_step - first_step)
+    simulator.latency = latency
+
+    tap = None
+    if sink is not None:
+        queue = asyncio.Queue(queue_size)
+        publisher = loop.create_task(_publish(queue, sink))
+        if simulator.recorder is not None:
+            # Rows are not kept in simulator.data
+            tap = simulator.recorder = _Tap(simulator)
+
+    elapsed = 0
+    t0 = loop.time()
+    n = first_step
+    try:
+        while n < last_step:
+            n += 1
+            release = t0 + (n - first_step - 1) * period
+            delay = release - loop.time()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            else:
+                # Let other tasks run even when behind schedule
+                await asyncio.sleep(0)
+            offset = simulator._offset
+            simulator.status = 'running until'
+            step_time = simulator._sim(n)
+            elapsed += step_time
+            latency.record(step_time, loop.time() > release + period)
+            if sink is not None:
+                rows = simulator.data[offset:simulator._offset] \
+                    if tap is None else tap.pop()
+                try:
+                    queue.put_nowait(rows)
+                except asyncio.QueueFull:
+                    latency.dropped += 1
+            if simulator.status == 'finished':
+                break
+    finally:
+        if tap is not None:
+            simulator.recorder = tap.recorder
+
+    if sink is not None:
+        await queue.join()
+        publisher.cancel()
+
+    return elapsed
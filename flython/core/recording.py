@@ -0,0 +1,325 @@
+import math
+import numpy as np
+
+from .block import Block
+
+
+class Recording:
+    """Recorder keeping a subset of the results
+
+    Fields are given by name, a block name or block selects all the
+    fields of the block dtype, the time 't' is always kept. Decimation
+    keeps the last row of every n-th major step (every) and/or rows at
+    least interval apart on the time grid of t_beg. With downcast the
+    floating point fields, except the time, are stored as float32.
+    The buffer is preallocated for the decimated number of rows.
+
+    """
+
+    def __init__(self, simulator, fields=None, every=1, interval=None,
+                 downcast=False):
+        self._simulator = simulator
+        self.fields = fields
+        self.every = every
+        self.interval = interval
+        self.downcast = downcast
+        self.data = None
+
+    def _names(self, dtype):
+        if self.fields is None:
+            return list(dtype.names)
+        blocks = {b._name: b for b in self._simulator._blocks}
+        names = ['t']
+        for field in self.fields:
+            if isinstance(field, str) and field in blocks:
+                field = blocks[field]
+            if isinstance(field, Block):
+                names += np.dtype(field.dtype).names
+            else:
+                names.append(field)
+        for name in names:
+            if name not in dtype.names:
+                raise KeyError("No field '{}' in the results.".format(name))
+        return list(dict.fromkeys(names))
+
+    def _allocate(self, rows):
+        s = self._simulator
+        names = self._names(rows.dtype)
+        self._select = names
+        dtype = []
+        for name in names:
+            t = rows.dtype[name]
+            if self.downcast and name != 't' and t.kind == 'f' \
+               and t.itemsize > 4:
+                t = np.dtype('<f4') if t.shape == () \
+                    else np.dtype(('<f4', t.shape))
+            dtype.append((name, t))
+        # Estimate number of rows
+        if math.isinf(s.total_number_of_steps):
+            self._chunk = 1024
+        elif self.interval:
+            self._chunk = int((s.t_end - s.t_beg) / self.interval) + 2
+        elif self.every > 1:
+            self._chunk = s.total_number_of_steps // self.every + 1
+        else:
+            self._chunk = max(s.total_number_of_steps * len(rows), 1)
+        self.data = np.empty(self._chunk, dtype)
+        self._offset = 0
+        self._step = None
+        self._bin = -math.inf
+
+    def append(self, rows):
+        if self.data is None:
+            self._allocate(rows)
+        n = self._simulator.current_step
+        if self.every > 1:
+            if n % self.every:
+                return
+            rows = rows[-1:]
+        if self.interval:
+            bins = np.floor((rows['t'] - self._simulator.t_beg)
+                            / self.interval + 1e-9)
+            keep = np.flatnonzero(bins > self._bin)
+            if not len(keep):
+                return
+            bins, first = np.unique(bins[keep], return_index=True)
+            rows = rows[keep[first]]
+            self._bin = bins[-1]
+        elif self.every > 1 and n == self._step:
+            # Rows of the same step after an event, keep the last
+            self._offset -= 1
+        self._step = n
+
+        # Expand array if necessary
+        if len(self.data) < self._offset + len(rows):
+            self.data = np.append(
+                self.data, np.empty(max(self._chunk, len(rows)),
+                                    self.data.dtype))
+        out = self.data[self._offset:self._offset+len(rows)]
+        for name in self._select:
+            out[name] = rows[name]
+        self._offset += len(rows)
+
+    def result(self):
+        if self.data is None:
+            return None
+        return self.data[:self._offset]
+
+
+class Groups:
+    """Recorder combining recordings of several field groups
+
+    Groups are given as name=Recording(...), e.g. fast signals at every
+    step and slow ones decimated. The result is a dict of arrays.
+
+    """
+
+    def __init__(self, **recordings):
+        self.recordings = recordings
+        self._append = tuple(r.append for r in recordings.values())
+
+    def append(self, rows):
+        for append in self._append:
+            append(rows)
+
+    def result(self):
+        return {name: recording.result()
+                for name, recording in self.recordings.items()}
+
+
+class Window:
+    """Recorder keeping only the most recent rows, in a ring buffer
+
+    The window holds the last `rows` rows or the rows of the last
+    `seconds` of simulation time. Rows are written in place with
+    wraparound; the buffer is mirrored, every row is written twice,
+    so the result is always a time-ordered view without copying.
+    A window in seconds is sized from the rows of the first step and
+    only grows if the window later holds more rows than estimated.
+
+    """
+
+    def __init__(self, simulator, rows=None, seconds=None):
+        if (rows is None) == (seconds is None):
+            raise ValueError("Window size must be given either in rows "
+                             "or in seconds.")
+        self._simulator = simulator
+        self.rows = rows
+        self.seconds = seconds
+        self.data = None
+
+    def _allocate(self, size, dtype):
+        self._size = size
+        self.data = np.empty(2 * size, dtype)
+        self._end = 0
+
+    def _view(self):
+        n = min(self._end, self._size)
+        start = (self._end - n) % self._size
+        return self.data[start:start+n]
+
+    def _write(self, rows):
+        N = self._size
+        rows = rows[-N:]
+        k = len(rows)
+        i = self._end % N
+        j = min(k, N - i)
+        for base in (0, N):
+            self.data[base+i:base+i+j] = rows[:j]
+            self.data[base:base+k-j] = rows[j:]
+        self._end += k
+
+    def append(self, rows):
+        if self.data is None:
+            if self.rows is not None:
+                size = self.rows
+            else:
+                size = (math.ceil(self.seconds / self._simulator.sample_time)
+                        + 1) * len(rows)
+            self._allocate(size, rows.dtype)
+        elif self.seconds is not None \
+                and self._end + len(rows) > self._size:
+            window = self._view()
+            inside = len(window) - np.searchsorted(
+                window['t'], rows['t'][-1] - self.seconds)
+            if inside + len(rows) > self._size:
+                window = window[len(window)-inside:].copy()
+                self._allocate(2 * (inside + len(rows)), rows.dtype)
+                self._write(window)
+        self._write(rows)
+
+    def result(self):
+        if self.data is None:
+            return None
+        window = self._view()
+        if self.seconds is not None and len(window):
+            window = window[np.searchsorted(
+                window['t'], window['t'][-1] - self.seconds):]
+        return window
+
+
+class Encoded:
+    """Recorder storing discrete signals only when they change
+
+    Signals logged as 2D arrays (time and continuous states, one row
+    per solver step) are stored row by row, all other signals, which
+    the simulator would otherwise hold over every row of the step, are
+    stored per rate group (the fields of one signal) only at the steps
+    where their value changes. Every group has a 'step' column with
+    the major step and an 'entry' column numbering the log entries.
+    The result is this recorder: `groups` holds the stored arrays,
+    item access returns a field held over the rows of the fastest
+    group and zoh() rebuilds the full results of a normal run.
+
+    """
+
+    def __init__(self, simulator):
+        self._simulator = simulator
+        self.groups = None
+
+    def _allocate(self, data):
+        s = self._simulator
+        self._layout = []
+        self.groups = {}
+        self._offsets = {}
+        self._last = {}
+        # Sample time ratios of the blocks by their fields
+        ratios = {np.dtype(block.dtype).names:
+                  getattr(block, '_sample_time_ratio', 1)
+                  for block in s._blocks if hasattr(block, 'dtype')}
+        open_ended = math.isinf(s.total_number_of_steps)
+        fast = []
+        for value, dtype in data:
+            names = np.dtype(dtype).names
+            if np.ndim(value) == 2:
+                fast += dtype
+                self._layout.append((None, names))
+            else:
+                self._layout.append((names, names))
+                # At most one change per sample hit
+                self._new(names, dtype, 1024 if open_ended else
+                          s.total_number_of_steps // ratios.get(names, 1)
+                          + 1)
+        if fast:
+            chunk = 100 if open_ended else s.total_number_of_steps
+            self._new(None, fast, chunk * max(len(data[0][0]), 1))
+        self._entry = 0
+
+    def _new(self, key, dtype, size):
+        self.groups[key] = np.empty(
+            max(size, 1), [('entry', '<i8'), ('step', '<i8')] + list(dtype))
+        self._offsets[key] = 0
+
+    def _reserve(self, key, rows):
+        offset = self._offsets[key]
+        group = self.groups[key]
+        if len(group) < offset + rows:
+            # Grow geometrically, appends take amortized constant time
+            grown = np.empty(max(2 * len(group), offset + rows), group.dtype)
+            grown[:offset] = group[:offset]
+            self.groups[key] = grown
+        self._offsets[key] = offset + rows
+        return offset
+
+    def log(self, data):
+        """Store the signals of one log entry, see Simulator._log"""
+
+        if self._simulator.stop_conditions:
+            raise ValueError("Stop conditions need the full rows, "
+                             "they can not be used with encoded recording.")
+        if self.groups is None:
+            self._allocate(data)
+        step = self._simulator.current_step
+        fast = None
+        for (key, names), (value, dtype) in zip(self._layout, data):
+            if key is None:
+                value = np.asarray(value)
+                if fast is None:
+                    offset = self._reserve(None, value.shape[0])
+                    fast = self.groups[None][offset:offset+value.shape[0]]
+                    fast['entry'] = self._entry
+                    fast['step'] = step
+                for j, name in enumerate(names):
+                    fast[name] = value[:, j]
+            else:
+                value = tuple(np.ravel(value).tolist())
+                if self._last.get(key) == value:
+                    continue
+                self._last[key] = value
+                offset = self._reserve(key, 1)
+                self.groups[key][offset] = (self._entry, step) + value
+        self._entry += 1
+
+    def append(self, rows):
+        raise TypeError("Encoded recording stores signals, not rows.")
+
+    def result(self):
+        return self
+
+    def __getitem__(self, name):
+        """Return a field held over the rows of the fastest group"""
+
+        for key, array in self.groups.items():
+            if name in array.dtype.names:
+                array = array[:self._offsets[key]]
+                break
+        else:
+            raise KeyError(name)
+        if key is None:
+            return array[name]
+        fast = self.groups[None][:self._offsets[None]]
+        index = np.searchsorted(array['entry'], fast['entry'], 'right') - 1
+        return array[name][index]
+
+    def zoh(self):
+        """Return the results as logged without encoding"""
+
+        fast = self.groups[None][:self._offsets[None]]
+        dtype = []
+        for key, names in self._layout:
+            array = self.groups[key]
+            dtype += [(name, array.dtype[name]) for name in names]
+        data = np.empty(len(fast), dtype)
+        for name in data.dtype.names:
+            data[name] = self[name]
+        return data
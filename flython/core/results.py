@@ -0,0 +1,156 @@
+import numpy as np
+
+
+class Results(np.ndarray):
+    """Simulation results with queries on the time index
+
+    A view of the structured results array, nothing is copied. Rows are
+    sorted by the 't' field, so queries are binary searches. Fields in
+    `held` are discrete signals, held between their updates (ZOH), the
+    others are interpolated linearly when resampled.
+
+    """
+
+    def __array_finalize__(self, obj):
+        self.held = getattr(obj, 'held', ())
+        self._lod = {}
+
+    def _index(self, t, side='right'):
+        """Return index of the last row at or before each t"""
+        return np.searchsorted(self['t'], t, side) - 1
+
+    def at(self, t):
+        """Return the last row at or before t"""
+        i = self._index(t)
+        if i < 0:
+            raise IndexError("No results at t={:g}.".format(t))
+        return self[i]
+
+    def between(self, t0, t1):
+        """Return the rows with t0 <= t <= t1, as a view"""
+        t = self['t']
+        return self[np.searchsorted(t, t0, 'left'):
+                    np.searchsorted(t, t1, 'right')]
+
+    def grid(self, dt, t0=None, t1=None):
+        t0 = self['t'][0] if t0 is None else t0
+        t1 = self['t'][-1] if t1 is None else t1
+        return t0 + dt * np.arange(int(np.floor((t1 - t0) / dt + 1e-9)) + 1)
+
+    def resample(self, grid):
+        """Return all fields at the given times, or every grid seconds
+
+        One search locates the grid points for all fields; fields are
+        interpolated linearly, the held ones keep the last value.
+
+        """
+        if np.isscalar(grid):
+            grid = self.grid(grid)
+        grid = np.asarray(grid, float)
+        n = len(self)
+        t = self['t']
+        held = np.clip(self._index(grid), 0, n - 1)
+        i = np.clip(held, 0, max(n - 2, 0))
+        j = np.minimum(i + 1, n - 1)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            w = np.clip(np.where(t[j] > t[i], (grid - t[i]) / (t[j] - t[i]),
+                                 0.), 0, 1)
+
+        names = self.dtype.names
+        zoh = [k for k, name in enumerate(names) if name in self.held
+               or self.dtype[name].kind not in 'fc']
+        if self.dtype.itemsize == 8 * len(names) and self.flags.c_contiguous \
+           and all(self.dtype[k] == np.float64 for k in range(len(names))):
+            # All fields at once on the float matrix view of the rows
+            x = np.asarray(self).view(np.float64).reshape(n, len(names))
+            y = x[i] + (x[j] - x[i]) * w[:, None]
+            y[:, zoh] = x[held][:, zoh]
+            data = y.view(self.dtype)[:, 0].view(Results)
+        else:
+            data = np.empty(len(grid), self.dtype).view(Results)
+            for k, name in enumerate(names):
+                x = self[name]
+                data[name] = x[held] if k in zoh \
+                    else x[i] + (x[j] - x[i]) * w
+        data.held = self.held
+        data['t'] = grid
+        return data
+
+    def align(self, other, dt):
+        """Resample two runs on the common time range, every dt seconds"""
+        other = np.asarray(other).view(Results) \
+            if not isinstance(other, Results) else other
+        grid = self.grid(dt, max(self['t'][0], other['t'][0]),
+                         min(self['t'][-1], other['t'][-1]))
+        return self.resample(grid), other.resample(grid)
+
+    def lod(self, field, width, t0=None, t1=None):
+        """Return (t, y) of a field decimated for plotting, M4 style
+
+        The range [t0, t1] is split into width buckets (pixels) and the
+        first, last, minimum and maximum rows of every bucket are kept,
+        so a line plot of at most 4 * width points looks the same as
+        the plot of all rows. Results are cached per zoom level.
+
+        """
+        t0 = self['t'][0] if t0 is None else t0
+        t1 = self['t'][-1] if t1 is None else t1
+        key = (field, int(width), t0, t1)
+        if key in self._lod:
+            return self._lod[key]
+
+        # Include the neighbours, so lines run to the edges of the view
+        t = self['t']
+        i0 = max(np.searchsorted(t, t0, 'left') - 1, 0)
+        i1 = min(np.searchsorted(t, t1, 'right') + 1, len(self))
+        t, y = t[i0:i1], self[field][i0:i1]
+        if len(t) <= 4 * width:
+            result = (t, y)
+        else:
+            edges = np.searchsorted(
+                t, np.linspace(t0, t1, int(width) + 1)[1:-1])
+            starts = np.unique(np.concatenate(([0], edges)))
+            starts = starts[starts < len(t)]
+            counts = np.diff(np.append(starts, len(t)))
+            bucket = np.repeat(np.arange(len(starts)), counts)
+            keep = [starts, starts + counts - 1]
+            for extreme in (np.minimum, np.maximum):
+                hits = np.flatnonzero(
+                    y == np.repeat(extreme.reduceat(y, starts), counts))
+                keep.append(hits[np.unique(bucket[hits],
+                                           return_index=True)[1]])
+            index = np.unique(np.concatenate(keep))
+            result = (t[index], y[index])
+        self._lod[key] = result
+        return result
+
+    def plot(self, field, ax=None, **kwargs):
+        """Plot a field, decimated to the width of the axes
+
+        The data is fetched again at the detail of the view whenever
+        the x limits change, e.g. when zooming. Returns the line.
+
+        """
+        import matplotlib.pyplot as plt
+
+        ax = ax or plt.gca()
+
+        def width():
+            return max(int(ax.get_window_extent().width), 1)
+
+        line, = ax.plot(*self.lod(field, width()), **kwargs)
+
+        def update(ax):
+            t0, t1 = ax.get_xlim()
+            line.set_data(*self.lod(field, width(), t0, t1))
+            ax.figure.canvas.draw_idle()
+
+        ax.callbacks.connect('xlim_changed', update)
+        return line
+
+
+def wrap(data, held=()):
+    """Return results array as Results, without copying"""
+    data = np.asarray(data).view(Results)
+    data.held = tuple(held)
+    return data
@@ -45,12 +45,13 @@ class Settings:
 
 class SimulationSettings(Settings):
 
-    _names = ('solver', 't_beg', 't_end', 'sample_time')
+    _names = ('solver', 't_beg', 't_end', 'sample_time',
+              'observer', 'refresh_rate', 'cache', 'compile')
 
 
 class FlythonSettings(Settings):
 
-    _names = ('warnings_filter', 'file_logger', 'console_logger')
+    _names = ('warnings_filter', 'log_file', 'file_logger', 'console_logger')
 
     @exception_handler
     def __setattr__(self, name, value):
@@ -63,6 +64,9 @@ class FlythonSettings(Settings):
                 logger.debug('parameters.{}={}'.format(name, value))
                 warnings.resetwarnings()
                 warnings.simplefilter(value, UserWarning)
+        elif name == 'log_file':
+            logger_module.log_file(value)
+            logger.debug('parameters.{}={}'.format(name, value))
         elif name in ('file_logger', 'console_logger'):
             assert value in (
                 "debug", "info", "warning", "error", "critical"), \
@@ -1,30 +1,32 @@
+import asyncio
 import importlib.util
+import math
 import numpy as np
 import os
 
-import warnings
-
 from timeit import default_timer as timer
 from types import ModuleType
 
+from . import archive
+from . import cache
+from . import compiler
+from . import logger
+from . import conditions
+from . import metrics
+from . import observers
+from . import realtime
+from . import recording
+from . import results
 from .block import Definition
-
-# Event messages
-start_message = "Running '{}' with '{}' solver, " \
-                "for t in [{},{}], with step {}."
-failed = "Simulation broken. Try to reload a model."
-finished = "Simulation finished. Use reload()."
-simulation_completed = "\nSimulation completed. Total simulation time: {}."
-run_until_ignored = "Run until t={} ignored. Simulation already at t={}."
-run_until_completed = "\nRun until t={} completed. Partial run time: {}."
-step_completed = "\nStep completed. Total step time: {}."
+from .discrete import Discrete
+from .observers import pretty
 
 
 def exception_handler(fun):
 
-    def handler(self, *args):
+    def handler(self, *args, **kwargs):
         try:
-            fun(self, *args)
+            fun(self, *args, **kwargs)
         except FileNotFoundError as exc:
             self.status = 'failed'
             print("{}: {}".format(type(exc).__name__, exc))
@@ -32,28 +34,6 @@ def exception_handler(fun):
     return handler
 
 
-def pretty(t):
-    """Format duraton time"""
-
-    whole, frac = (x for x in str("{:.6f}".format(t)).rsplit("."))
-    if whole != '0':
-        whole = float(whole)
-        if whole < 999.5:
-            return "{:.3g}s".format(t)
-        else:
-            return "{:.1f}s".format(t)
-    else:
-        frac = round(float("."+frac)*10**6)
-        if frac < 1000:
-            return "{:g}us".format(frac)
-        elif round(frac/1000) < 100:
-            return "{:.2g}ms".format(frac/1000)
-        elif round(frac/1000) < 1000:
-            return "{:.3g}ms".format(frac/1000)
-        else:
-            return "{:.4g}ms".format(frac/1000)
-
-
 class Simulator:
     """Simulator class"""
 
@@ -62,6 +42,10 @@ class Simulator:
 
         # Status
         super().__setattr__('status', 'init')
+        super().__setattr__('_observer', observers.create(
+            defaults.observer, defaults.refresh_rate))
+        # Rate limiting of repeated warnings, see warn()
+        super().__setattr__('_warnings', logger.RateLimiter())
 
         # Reload arguments
         self._reload_model = model
@@ -107,15 +91,29 @@ class Simulator:
                 setattr(self, a, getattr(self.model, a))
             else:
                 setattr(self, a, getattr(defaults, a))
+        self._observer = observers.create(self.observer, self.refresh_rate)
+
+        # Custom recorder, see _log()
+        self.recorder = None
+        # Parameter changes queued to the next step, see update()
+        self._updates = []
+        # Early termination, see stop_when()
+        self.stop_conditions = []
 
         # Initialization completed
         self.status = 'ready'
 
     def __setattr__(self, name, value):
         if self.status is 'active' and name in self._reload_defaults._names:
-            self.warn("Simulation is active, '{}' can not be changed.".format(name))
+            self.warn("Simulation is active, '{}' can not be changed.", name)
         else:
             super().__setattr__(name, value)
+            # Keep the observer in line with its settings, unless they
+            # were not loaded yet
+            if name in ('observer', 'refresh_rate') \
+               and self.status not in ('init', 'failed'):
+                super().__setattr__('_observer', observers.create(
+                    self.observer, self.refresh_rate))
 
     def _start(self, *args):
         # Set status
@@ -124,21 +122,41 @@ class Simulator:
         # Estimate total number of simulation steps
         self.t = self.t_beg
         self.current_step = 0
-        self.total_number_of_steps = round(
-            (self.t_end - self.t_beg) / self.sample_time)
-        # Treat total number of simulation steps
-        # as an estimate of the logger chunk
-        self._chunk = self.total_number_of_steps
+        if math.isinf(self.t_end):
+            # Open-ended simulation, see iter_run()
+            self.total_number_of_steps = math.inf
+            self._chunk = 0
+        else:
+            self.total_number_of_steps = round(
+                (self.t_end - self.t_beg) / self.sample_time)
+            # Treat total number of simulation steps
+            # as an estimate of the logger chunk
+            self._chunk = self.total_number_of_steps
         self.data = None
         self._offset = 0
+        # Names of the fields held over the step, see results.Results
+        self._held = None
+        self.stop_reason = None
+        self._warnings.reset()
+        # Zero-crossing events located by continuous blocks
+        self.events = []
+        self._event_time = None
         # Perform block validation
         for block in self._blocks:
             block.simulator = self
             block.validate()
-        # Generate start message
-        print(start_message.format(
-            os.path.basename(self.model.__file__), self.solver,
-            self.t_beg, self.t_end, self.sample_time))
+        # Opt-in specialized steps, see compiler
+        for block in self._blocks:
+            if self.compile:
+                compiler.specialize(block)
+            else:
+                compiler.restore(block)
+        if self.compile:
+            self._log = compiler.trace(self)
+        else:
+            self.__dict__.pop('_log', None)
+        # Notify observers
+        self._observer.start(self)
 
     def reload(self):
         self.__init__(self._reload_model,
@@ -148,77 +166,279 @@ class Simulator:
     def run(self, t_stop=None):
         # Chcek current state
         if self.status is 'ready':
+            if self.cache and not t_stop and self.recorder is None \
+               and not self.stop_conditions:
+                return cache.create(self.cache).run(self)
             self._start()
         elif self.status is 'failed':
-            print(failed)
+            self._observer.notice(self, observers.failed)
             return
         elif self.status is 'finished':
-            print(finished)
-            return self.data[:self._offset]
+            self._observer.notice(self, observers.finished)
+            return self._result()
         # Perform run / run until
         if t_stop:
             self._run_until(t_stop)
         else:
             self._run()
-        return self.data[:self._offset]
+        return self._result()
 
     def _run(self):
+        if math.isinf(self.total_number_of_steps):
+            raise ValueError("Simulation horizon is open-ended. "
+                             "Use run(t_stop) or iter_run().")
         self.status = 'running'
-        print(simulation_completed.format(
-            pretty(self._sim(self.total_number_of_steps))))
+        self._observer.finish(self, self._sim(self.total_number_of_steps))
 
     def _run_until(self, t_stop):
         self.status = 'running until'
         last_step = round((t_stop - self.t_beg) / self.sample_time)
         if last_step <= self.current_step:
             self.status = 'active'
-            print(run_until_ignored.format(pretty(t_stop), pretty(self.t)))
+            self._observer.notice(self, observers.run_until_ignored.format(
+                pretty(t_stop), pretty(self.t)))
             return
-        print(run_until_completed.format(self.t, pretty(self._sim(last_step))))
+        self._observer.finish(self, self._sim(last_step), t_stop)
+
+    def iter_run(self, chunk_steps=100, t_stop=None):
+        """Run the simulation and yield the results in chunks
+
+        Each chunk is a structured array holding the results of (at
+        most) chunk_steps major steps. Every chunk is logged into its
+        own buffer, which is released as soon as the consumer drops
+        it, so memory use does not depend on the simulation horizon.
+        Only the last chunk is kept in `data`.
+
+        """
+        # Chcek current state
+        if self.status == 'ready':
+            self._start()
+        elif self.status == 'failed':
+            self._observer.notice(self, observers.failed)
+            return
+        elif self.status == 'finished':
+            self._observer.notice(self, observers.finished)
+            return
+        if t_stop:
+            last_step = min(round((t_stop - self.t_beg) / self.sample_time),
+                            self.total_number_of_steps)
+        else:
+            last_step = self.total_number_of_steps
+        elapsed = 0
+        while self.current_step < last_step and self.status != 'finished':
+            # Log next chunk into a new buffer
+            self.data = None
+            self._offset = 0
+            self._chunk = chunk_steps
+            self.status = 'running'
+            elapsed += self._sim(
+                min(self.current_step + chunk_steps, last_step))
+            yield self._result()
+        self._observer.finish(self, elapsed, t_stop)
+
+    def update(self, block, **parameters):
+        """Change parameters of a block during the session
+
+        Changes are applied at the next step boundary. Only the derived
+        data depending on the changed parameters is recomputed (see
+        Block.validate) and block states are preserved, so the session
+        may continue with run(t_stop) or step() without reload().
+
+        """
+        block = getattr(self.model, block) if isinstance(block, str) \
+            else block
+        for name in parameters:
+            if name not in block._parameters:
+                raise AttributeError("Block '{}' has no parameter '{}'".format(
+                    block._name, name))
+        if self.status in ('init', 'ready'):
+            # Blocks are validated at start
+            for name, value in parameters.items():
+                object.__setattr__(block, name, value)
+        else:
+            self._updates.append((block, parameters))
+
+    def _apply_updates(self):
+        updates, self._updates = self._updates, []
+        for block, parameters in updates:
+            for name, value in parameters.items():
+                object.__setattr__(block, name, value)
+            block.validate(tuple(parameters))
+
+    def stop_when(self, predicate, reason=None):
+        """Add stop condition, a StopCondition or a predicate
+
+        When a condition holds the run ends with status 'finished' and
+        the reason stored in stop_reason. See conditions.StopCondition.
+
+        """
+        if not isinstance(predicate, conditions.StopCondition):
+            predicate = conditions.StopCondition(
+                predicate, reason or getattr(predicate, '__name__', 'stop'))
+        self.stop_conditions.append(predicate)
+
+    def run_metrics(self, t_stop=None, **reductions):
+        """Run computing only the given reductions, see metrics.Metrics
+
+        Logged rows are not kept, a dict of scalars is returned. A
+        session continued with run_metrics(t_stop) keeps updating the
+        reductions of the session, which may then be omitted.
+
+        """
+        if self.status in ('init', 'ready', 'failed') \
+           or not isinstance(self.recorder, metrics.Metrics):
+            self.recorder = metrics.Metrics(**reductions)
+        elif reductions and {name: spec[0] for name, spec
+                             in reductions.items()} != self.recorder.specs:
+            raise ValueError("Session is active with reductions {}, they "
+                             "can not be changed.".format(
+                                 ', '.join(self.recorder.specs)))
+        return self.run(t_stop)
+
+    def record(self, fields=None, every=1, interval=None, downcast=False):
+        """Keep only a subset of the results, see recording.Recording"""
+        self.recorder = recording.Recording(
+            self, fields, every, interval, downcast)
+        return self.recorder
+
+    def record_archive(self, path, chunk_rows=65536, compress=None,
+                       overwrite=False):
+        """Append the results to a columnar archive while running, see
+        archive.Writer"""
+        self.recorder = archive.Writer(path, chunk_rows, compress, overwrite)
+        return self.recorder
+
+    def record_encoded(self):
+        """Store discrete signals only when they change, see
+        recording.Encoded"""
+        self.recorder = recording.Encoded(self)
+        return self.recorder
+
+    def record_window(self, rows=None, seconds=None):
+        """Keep only the most recent results, see recording.Window"""
+        self.recorder = recording.Window(self, rows, seconds)
+        return self.recorder
+
+    def run_realtime(self, t_stop=None, rt_factor=1, sink=None):
+        """Run in lockstep with the wall-clock time
+
+        Simulation time advances rt_factor times faster than the wall
+        clock. Per-step compute latency and deadline overruns are
+        collected in `latency`. See realtime.pace() for the sink.
+
+        """
+        # Chcek current state
+        if self.status == 'ready':
+            self._start()
+        elif self.status == 'failed':
+            self._observer.notice(self, observers.failed)
+            return
+        elif self.status == 'finished':
+            self._observer.notice(self, observers.finished)
+            return self._result()
+        if t_stop:
+            last_step = min(round((t_stop - self.t_beg) / self.sample_time),
+                            self.total_number_of_steps)
+        else:
+            last_step = self.total_number_of_steps
+        self._observer.finish(self, asyncio.run(realtime.pace(
+            self, last_step, rt_factor, sink)), t_stop)
+        return self._result()
 
     def step(self):
         # Chcek current state
         if self.status is 'ready':
             self._start()
         elif self.status is 'failed':
-            print(failed)
+            self._observer.notice(self, observers.failed)
             return
         elif self.status is 'finished':
-            print(finished)
-            return self.data[:self._offset]
+            self._observer.notice(self, observers.finished)
+            return self._result()
         # Perform step
         self._step()
-        return self.data[:self._offset]
+        return self._result()
 
     def _step(self):
         self.status = 'step'
-        print(step_completed.format(pretty(self._sim(self.current_step + 1))))
+        self._observer.step_done(self, self._sim(self.current_step + 1))
 
     def _sim(self, last_step):
 
-        c = 50 / self.total_number_of_steps
+        progress = self._observer.progress
         start_time = timer()
         # Adopt first and last step to python 'range'
         for n in range(self.current_step + 1, last_step + 1):
             t = self.t_beg + n * self.sample_time
+            if self._updates:
+                self._apply_updates()
             self.t = t
             self.current_step = n
-            print("\rProgress: [{0:50s}] {1:.1f}%".format(
-                '#' * int(n * c), n*2*c), end="", flush=True)
             self._log(self.model.signal_flow(t, n))
+            while self._event_time is not None \
+                    and self.stop_reason is None:
+                t_event, self._event_time = self._event_time, None
+                self._log(self._at_event(t_event, n))
+            progress(self)
+            if self.stop_reason is not None:
+                break
         end_time = timer()
         # Change status
-        if self.current_step >= self.total_number_of_steps:
+        if self.current_step >= self.total_number_of_steps \
+           or self.stop_reason is not None:
             self.status = 'finished'
         else:
             self.status = 'active'
 
         return end_time - start_time
 
+    def _at_event(self, t_event, n):
+        """Evaluate the model at an event located in major step n
+
+        The simulator time is the event time and every discrete block
+        gets a sample hit, its sample hit schedule is kept. Continuous
+        blocks then resume integration up to the major step.
+
+        """
+        discrete = [(block, block._prev_step) for block in self._blocks
+                    if isinstance(block, Discrete)]
+        for block, _ in discrete:
+            object.__setattr__(block, '_prev_step',
+                               n - block._sample_time_ratio)
+        t, self.t = self.t, t_event
+        try:
+            return self.model.signal_flow(t_event, n)
+        finally:
+            self.t = t
+            for block, prev_step in discrete:
+                object.__setattr__(block, '_prev_step', prev_step)
+
     def _log(self, data):
 
+        if hasattr(self.recorder, 'log'):
+            # Recorder taking the signals as returned by the model
+            self.recorder.log(data)
+            return
+        data = self._rows(data)
+
+        # Check stop conditions, drop rows past the first hit
+        for condition in self.stop_conditions:
+            last = condition(self, data)
+            if last is not None:
+                data = data[:last+1]
+                self.stop_reason = condition.reason
+                break
+
+        if self.recorder is None:
+            self._store(data)
+        else:
+            self.recorder.append(data)
+
+    def _rows(self, data):
+        """Return the signals returned by the model as structured rows"""
+
         # Rearrange data
-        array, dtype = None, None
+        array, dtype, held = None, None, []
         for el in data:
             # Ensure 2D ndarray
             el[0] = np.array(el[0])
@@ -226,34 +446,68 @@ class Simulator:
                 if el[0].ndim <= 1:
                     # ZOH interpolation
                     el[0] = el[0]*np.ones((array.shape[0], 1))
+                    held += el[1]
                 array = np.concatenate((array, el[0]), 1)
                 dtype += el[1]
 
             except ValueError:
                 array, dtype = el
-        data = np.array(list(zip(*array.T)), dtype)
+        if self._held is None:
+            self._held = tuple(np.dtype(held).names) if held else ()
+        dtype = np.dtype(dtype)
+        if dtype.itemsize == 8 * array.shape[1] \
+           and all(dtype[k] == np.float64 for k in range(len(dtype))):
+            # Plain float fields, reinterpret the rows without copying
+            data = np.ascontiguousarray(array, np.float64).view(dtype)[:, 0]
+        else:
+            data = np.array(list(zip(*array.T)), dtype)
+        return data
+
+    def _store(self, data):
 
         # Expand array if necessary
         try:
-            if len(self.data) < self._offset + array.shape[0]:
+            if len(self.data) < self._offset + data.shape[0]:
                 # Expand data
                 self.data = np.append(
                     self.data, np.empty(self._chunk, self.data.dtype))
         except TypeError:
             # Estimate chunk
-            self._chunk = max(self._chunk, 100*array.shape[0])
+            self._chunk = max(self._chunk, 100*data.shape[0])
             # Create an empty array given the data dtype
             self.data = np.empty(self._chunk, data.dtype)
 
         # Store data
-        self.data[self._offset:self._offset+array.shape[0]] = data
-        self._offset += array.shape[0]
-
-    def warn(self, message):
-        if self.status in ('running', 'running until'):
-            message = "\x1b[2K\rWarning: " + message
-        elif self.status is 'step':
-            message = "\nWarning: " + message + "\033[F"
-        else:
-            message = "Warning: " + message
-        warnings.warn(message)
+        self.data[self._offset:self._offset+data.shape[0]] = data
+        self._offset += data.shape[0]
+
+    def _result(self):
+        if self.recorder is not None:
+            return self.recorder.result()
+        return results.wrap(self.data[:self._offset], self._held)
+
+    def event(self, block, name, t):
+        """Record zero-crossing event located by a continuous block"""
+        self.events.append((t, block._name, name))
+        self._event_time = t
+
+    def warn(self, message, *args):
+        """Report a warning given as a template and its arguments
+
+        The message is formatted only when it is shown. Repeated
+        warnings of a template are rate limited, the number suppressed
+        is reported with the next one shown; totals per template are
+        kept in warning_counts.
+
+        """
+        show, suppressed = self._warnings(message)
+        if show:
+            if args:
+                message = message.format(*args)
+            if suppressed:
+                message += logger.repeated.format(suppressed)
+            self._observer.warning(self, message)
+
+    @property
+    def warning_counts(self):
+        return dict(self._warnings.counts)
@@ -0,0 +1,183 @@
+import multiprocessing
+import numpy as np
+import os
+import pickle
+import sqlite3
+import tempfile
+import time
+
+from .ensemble import load
+
+schema = """CREATE TABLE IF NOT EXISTS cases (
+    id TEXT PRIMARY KEY,
+    parameters BLOB,
+    status TEXT DEFAULT 'pending',
+    path TEXT,
+    worker INTEGER,
+    error TEXT,
+    updated REAL)"""
+
+
+def connect(ledger):
+    connection = sqlite3.connect(ledger, timeout=60, isolation_level=None)
+    connection.execute('PRAGMA journal_mode=WAL')
+    return connection
+
+
+def _alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+def _claim(connection):
+    """Mark next pending case as running, return (id, parameters)"""
+
+    connection.execute('BEGIN IMMEDIATE')
+    try:
+        row = connection.execute(
+            "SELECT id, parameters FROM cases WHERE status='pending' "
+            "LIMIT 1").fetchone()
+        if row is not None:
+            connection.execute(
+                "UPDATE cases SET status='running', worker=?, updated=? "
+                "WHERE id=?", (os.getpid(), time.time(), row[0]))
+    finally:
+        connection.execute('COMMIT')
+    return row
+
+
+def _work(model, directory):
+    """Worker process loop, run pending cases until there are none"""
+
+    connection = connect(os.path.join(directory, 'ledger.sqlite'))
+    while True:
+        row = _claim(connection)
+        if row is None:
+            break
+        case, parameters = row
+        try:
+            simulator = load(model, **pickle.loads(parameters))
+            data = simulator.run()
+            if simulator.status == 'failed':
+                # Load errors are reported, not raised, by the simulator
+                raise FileNotFoundError(
+                    "Model '{}' not found".format(model))
+            # Write results before marking the case as done
+            path = os.path.join(directory, 'results', case + '.npy')
+            fd, tmp = tempfile.mkstemp('.tmp', dir=os.path.dirname(path))
+            with os.fdopen(fd, 'wb') as f:
+                np.save(f, data)
+            os.replace(tmp, path)
+            connection.execute(
+                "UPDATE cases SET status='done', path=?, updated=? "
+                "WHERE id=?", (path, time.time(), case))
+        except Exception as exc:
+            connection.execute(
+                "UPDATE cases SET status='failed', error=?, updated=? "
+                "WHERE id=?", ("{}: {}".format(type(exc).__name__, exc),
+                               time.time(), case))
+    connection.close()
+
+
+class Sweep:
+    """Resumable parameter sweep with an on-disk job ledger
+
+    Each case is a dict of model block parameters, see flython.load.
+    Case status and results location are recorded in an SQLite ledger
+    in the given directory and results are written as .npy files as
+    soon as each case finishes. Running the sweep again skips the
+    completed cases; cases left running by dead workers are retried.
+    Several worker processes, also of separate sweep runs, may pull
+    cases from the same ledger.
+
+    """
+
+    def __init__(self, model, directory):
+
+        self.model = str(model)
+        self.directory = directory
+        self.ledger = os.path.join(directory, 'ledger.sqlite')
+        os.makedirs(os.path.join(directory, 'results'), exist_ok=True)
+        connection = connect(self.ledger)
+        connection.execute(schema)
+        connection.close()
+
+    def add(self, cases):
+        """Add cases given as {id: parameters} or a sequence
+
+        Cases already in the ledger are left untouched, so adding the
+        same cases again after a restart is harmless.
+
+        """
+
+        if not isinstance(cases, dict):
+            cases = {str(i): p for i, p in enumerate(cases)}
+        connection = connect(self.ledger)
+        connection.execute('BEGIN IMMEDIATE')
+        connection.executemany(
+            "INSERT OR IGNORE INTO cases (id, parameters) VALUES (?, ?)",
+            ((str(k), pickle.dumps(p)) for k, p in cases.items()))
+        connection.execute('COMMIT')
+        connection.close()
+        return self
+
+    def run(self, processes=None, retry_failed=False):
+        """Run pending cases in worker processes, return status counts"""
+
+        connection = connect(self.ledger)
+        # Requeue cases of dead workers
+        connection.execute('BEGIN IMMEDIATE')
+        for case, pid in connection.execute(
+                "SELECT id, worker FROM cases WHERE status='running'"
+                ).fetchall():
+            if pid is None or not _alive(pid):
+                connection.execute(
+                    "UPDATE cases SET status='pending' WHERE id=?", (case,))
+        if retry_failed:
+            connection.execute(
+                "UPDATE cases SET status='pending' WHERE status='failed'")
+        connection.execute('COMMIT')
+        connection.close()
+
+        workers = [multiprocessing.Process(
+            target=_work, args=(self.model, self.directory))
+            for _ in range(processes or os.cpu_count())]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+        return self.status()
+
+    def status(self):
+        """Return number of cases per status"""
+
+        connection = connect(self.ledger)
+        counts = dict(connection.execute(
+            "SELECT status, count(*) FROM cases GROUP BY status"))
+        connection.close()
+        return counts
+
+    def results(self):
+        """Yield (id, results) of completed cases, memory-mapped"""
+
+        connection = connect(self.ledger)
+        rows = connection.execute(
+            "SELECT id, path FROM cases WHERE status='done' ORDER BY id"
+            ).fetchall()
+        connection.close()
+        for case, path in rows:
+            yield case, np.load(path, mmap_mode='r')
+
+    def errors(self):
+        """Return {id: error} of failed cases"""
+
+        connection = connect(self.ledger)
+        errors = dict(connection.execute(
+            "SELECT id, error FROM cases WHERE status='failed'"))
+        connection.close()
+        return errors
@@ -0,0 +1,170 @@
+import multiprocessing
+import numpy as np
+import scipy.optimize
+
+from .ensemble import load
+
+pruned = 'pruned'
+
+
+class Cost:
+    """Recorder accumulating the stage cost of every step"""
+
+    def __init__(self, stage_cost):
+        self.stage_cost = stage_cost
+        self.value = 0.
+
+    def append(self, rows):
+        self.value += self.stage_cost(rows)
+
+    def result(self):
+        return self.value
+
+
+def overrides(simulator, names, x):
+    """Return model block parameters with the named ones replaced
+
+    Names are given as 'block.parameter'. Parameters which are not
+    tuned keep the values resolved from the model definitions.
+
+    """
+
+    parameters = {}
+    for block in simulator._blocks:
+        p = {k: getattr(block, k) for k in block._parameters}
+        if block.x is not None:
+            p['x'] = block.x
+        parameters[block._name] = p
+    for name, value in zip(names, x):
+        block, parameter = name.rsplit('.', 1)
+        parameters[block][parameter] = value
+    return parameters
+
+
+# Worker process state
+_model = None
+_names = None
+_base = None
+_stage_cost = None
+_best = None
+
+
+def _attach(model, names, stage_cost, best):
+    global _model, _names, _base, _stage_cost, _best
+    _model, _names, _stage_cost, _best = model, names, stage_cost, best
+    _base = load(_model)
+
+
+def _evaluate(x):
+    """Return total cost of a candidate, infinite when pruned
+
+    The partial cost of a pruned run is only a lower bound of its total
+    cost, so it is not returned: differential evolution compares a
+    trial with its target, not with the best candidate, and a lower
+    bound could replace a better target.
+
+    """
+
+    simulator = load(_model, **overrides(_base, _names, x))
+    cost = Cost(_stage_cost)
+    simulator.recorder = cost
+    if _best is not None:
+        # Stop as soon as the candidate is worse than the best one
+        simulator.stop_when(lambda s, rows: cost.value > _best.value,
+                            pruned)
+    try:
+        simulator.run()
+    except Exception:
+        return np.inf
+    if cost.value != cost.value or simulator.stop_reason == pruned:
+        return np.inf
+    if _best is not None:
+        with _best.get_lock():
+            _best.value = min(_best.value, cost.value)
+    return cost.value
+
+
+class Tuner:
+    """Automatic tuning of model block parameters
+
+    Parameters are given as {'block.parameter': (low, high)}. The cost
+    of a candidate is the sum of stage_cost(rows) over the rows logged
+    in every step, so it must be non-negative: with differential
+    evolution a run is cut off once its partial cost exceeds the best
+    total cost found so far, and its cost is then infinite. Other
+    methods, which may need finite costs, run every candidate to the end.
+    Candidates are evaluated in worker processes through the model
+    block parameters override of flython.load, and memoized on the
+    parameter vector.
+
+    """
+
+    def __init__(self, model, parameters, stage_cost, processes=None):
+
+        self.model = str(model)
+        self.names = tuple(parameters)
+        self.bounds = [parameters[name] for name in self.names]
+        self.stage_cost = stage_cost
+        self.processes = processes
+        self.cache = {}
+        self.evaluations = 0
+
+    def _map(self, fun, candidates):
+        """Evaluate candidates in parallel, reusing cached costs
+
+        Used as the workers map of scipy.optimize, fun is the wrapped
+        objective of this tuner and is evaluated by the worker pool.
+
+        """
+
+        candidates = [np.asarray(x, float) for x in candidates]
+        keys = [x.tobytes() for x in candidates]
+        pending = {}
+        for key, x in zip(keys, candidates):
+            if key not in self.cache:
+                pending[key] = x
+        for key, cost in zip(pending, self._pool.map(
+                _evaluate, pending.values())):
+            self.cache[key] = cost
+        self.evaluations += len(pending)
+        return [self.cache[key] for key in keys]
+
+    def objective(self, x):
+        return self._map(None, [x])[0]
+
+    def run(self, method='differential_evolution', **options):
+        """Run the search, return scipy OptimizeResult
+
+        Differential evolution evaluates whole populations in parallel,
+        any other method is passed to scipy.optimize.minimize.
+        The result holds the best parameters in `parameters`.
+
+        """
+
+        # Best total cost shared by the workers, for pruning
+        best = multiprocessing.Value('d', np.inf) \
+            if method == 'differential_evolution' else None
+        with multiprocessing.Pool(
+                self.processes, _attach,
+                (self.model, self.names, self.stage_cost, best)) as pool:
+            self._pool = pool
+            if method == 'differential_evolution':
+                options.setdefault('polish', False)
+                result = scipy.optimize.differential_evolution(
+                    self.objective, self.bounds, workers=self._map,
+                    updating='deferred', **options)
+            else:
+                x0 = options.pop('x0', [np.mean(b) for b in self.bounds])
+                result = scipy.optimize.minimize(
+                    self.objective, x0, method=method, bounds=self.bounds,
+                    **options)
+            del self._pool
+        result.parameters = dict(zip(self.names, result.x))
+        return result
+
+
+def tune(model, parameters, stage_cost, method='differential_evolution',
+         processes=None, **options):
+    """Tune model block parameters, see Tuner"""
+    return Tuner(model, parameters, stage_cost, processes).run(
+        method, **options)
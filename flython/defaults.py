@@ -5,7 +5,18 @@ t_beg = 0
 t_end = 10.0
 sample_time = 0.01
 
+# Progress reporting: 'terminal', 'headless' or an observer instance
+observer = 'terminal'
+# Maximum number of progress bar redraws per second
+refresh_rate = 10
+# Result cache: None, True (default directory) or a ResultCache
+cache = None
+# Specialized block steps and logger, see flython.core.compiler
+compile = False
+
 # Flython settings
 warnings_filter = 'interpreter'
+# Log file, None for ~/.cache/flython/flython.log or $FLYTHON_LOG
+log_file = None
 file_logger = 'info'
 console_logger = 'warning'
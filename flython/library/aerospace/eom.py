@@ -3,6 +3,29 @@ import numpy as np
 from flython import Continuous
 
 
+def longitudinal_dynamics(vehicle, x, u):
+    """Array-aware SimplifiedLongitudinalMotion.f
+
+    States x (..., 6) and inputs u (..., 4) are stacked along the
+    leading axes, the state derivatives are returned as (..., 6).
+
+    """
+
+    Fx, Fz, M = vehicle.external_inputs_batch(x, u)
+
+    u, w, q, theta = np.moveaxis(np.asarray(x, float)[..., 0:4], -1, 0)
+
+    s_th = np.sin(theta)
+    c_th = np.cos(theta)
+
+    return np.stack([Fx / vehicle.mass - q * w,
+                     Fz / vehicle.mass + q * u,
+                     M * np.ones_like(u),
+                     q,
+                     c_th * u + s_th * w,
+                     -s_th * u + c_th * w], -1)
+
+
 class SimplifiedLongitudinalMotion(Continuous):
     """Simplified model of the longitudinal motion.
 
@@ -0,0 +1,162 @@
+import hashlib
+import numpy as np
+import os
+
+from .eom import longitudinal_dynamics
+
+_tables = {}
+
+
+def trim_states(alpha, V, gamma, T):
+    """Return trim states and inputs of steady level or climbing flight"""
+
+    theta = alpha + gamma
+    zero = np.zeros_like(alpha)
+    x = np.stack([V * np.cos(alpha), V * np.sin(alpha), zero, theta,
+                  zero, zero], -1)
+    u = np.stack([T, zero, zero, zero], -1)
+    return x, u
+
+
+def trim(vehicle, V, gamma, alpha0=0.05, tol=1e-10, max_iter=50, h=1e-7):
+    """Solve trim conditions of many flight conditions at once
+
+    For airspeeds V and flight path angles gamma (arrays of the same
+    shape) find the angle of attack and thrust with zero linear
+    accelerations. Newton iterations run on all conditions together,
+    the 2x2 Jacobians by vectorized finite differences. Returns the
+    trim states (..., 6), inputs (..., 4) and the converged mask.
+
+    """
+
+    V, gamma = np.broadcast_arrays(np.asarray(V, float),
+                                   np.asarray(gamma, float))
+    z = np.stack([np.full(V.shape, alpha0, float),
+                  np.zeros(V.shape)], -1)
+
+    def residual(z, V, gamma):
+        x, u = trim_states(z[..., 0], V, gamma, z[..., 1])
+        return longitudinal_dynamics(vehicle, x, u)[..., 0:2]
+
+    for _ in range(max_iter):
+        r = residual(z, V, gamma)
+        converged = np.abs(r).max(-1) < tol
+        if converged.all():
+            break
+        # Jacobians of all conditions, perturbed columns stacked
+        dz = z[..., None, :] + h * np.eye(2)
+        J = (residual(dz, V[..., None], gamma[..., None])
+             - r[..., None, :]).swapaxes(-1, -2) / h
+        step = np.linalg.solve(J, -r[..., None])[..., 0]
+        z = np.where(converged[..., None], z, z + step)
+    else:
+        converged = np.abs(residual(z, V, gamma)).max(-1) < tol
+
+    x, u = trim_states(z[..., 0], V, gamma, z[..., 1])
+    return x, u, converged
+
+
+def linearize(vehicle, x, u, h=1e-6):
+    """Return A = df/dx and B = df/du at many points at once
+
+    Central differences, all perturbations of all points are evaluated
+    in a single call of the dynamics.
+
+    """
+
+    x = np.asarray(x, float)
+    u = np.asarray(u, float)
+    n, m = x.shape[-1], u.shape[-1]
+    E = np.eye(n + m) * h
+    xu = np.concatenate((x, u), -1)[..., None, :]
+    # Perturbed points (..., 2 * (n + m), n + m)
+    p = np.concatenate((xu + E, xu - E), -2)
+    f = longitudinal_dynamics(vehicle, p[..., :n], p[..., n:])
+    J = (f[..., :n+m, :] - f[..., n+m:, :]).swapaxes(-1, -2) / (2 * h)
+    return J[..., :n], J[..., n:]
+
+
+class TrimTable:
+    """Gain-scheduling table of trim points and linear models
+
+    Trim states x, inputs u and matrices A, B are stored on the grid of
+    airspeeds V and flight path angles gamma, with the leading axes
+    (len(V), len(gamma)). lookup() interpolates them bilinearly.
+
+    """
+
+    _fields = ('V', 'gamma', 'x', 'u', 'A', 'B', 'converged')
+
+    def __init__(self, **arrays):
+        for name in self._fields:
+            setattr(self, name, arrays[name])
+
+    def save(self, path):
+        np.savez(path, **{name: getattr(self, name)
+                          for name in self._fields})
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path) as data:
+            return cls(**{name: data[name] for name in cls._fields})
+
+    def lookup(self, V, gamma):
+        """Return x, u, A, B interpolated at a flight condition"""
+
+        weights = []
+        for grid, value in ((self.V, V), (self.gamma, gamma)):
+            if len(grid) == 1:
+                weights.append((0, 0, 0.))
+                continue
+            i = int(np.clip(np.searchsorted(grid, value) - 1, 0,
+                            len(grid) - 2))
+            w = np.clip((value - grid[i]) / (grid[i+1] - grid[i]), 0, 1)
+            weights.append((i, i + 1, w))
+        (i0, i1, wv), (j0, j1, wg) = weights
+
+        def interpolate(a):
+            return (1 - wv) * ((1 - wg) * a[i0, j0] + wg * a[i0, j1]) \
+                + wv * ((1 - wg) * a[i1, j0] + wg * a[i1, j1])
+
+        return tuple(interpolate(getattr(self, name))
+                     for name in ('x', 'u', 'A', 'B'))
+
+
+def _key(vehicle, V, gamma):
+    h = hashlib.sha256()
+    for value in (V, gamma, vehicle.alpha, vehicle.CL, vehicle.CD,
+                  np.array([vehicle.mass, vehicle.Sw], float)):
+        h.update(np.ascontiguousarray(value, float).tobytes())
+    h.update('{}.{}'.format(vehicle.__module__,
+                            vehicle.__qualname__).encode())
+    return h.hexdigest()
+
+
+def trim_table(vehicle, V, gamma, directory=None):
+    """Return the gain-scheduling table of a grid of flight conditions
+
+    Tables are cached in memory and, when a directory is given, as .npz
+    files named after a hash of the grid and the vehicle data.
+
+    """
+
+    V = np.asarray(V, float).ravel()
+    gamma = np.asarray(gamma, float).ravel()
+    key = _key(vehicle, V, gamma)
+    if key in _tables:
+        return _tables[key]
+    path = None if directory is None else \
+        os.path.join(os.path.expanduser(directory), key + '.npz')
+    if path is not None and os.path.exists(path):
+        table = TrimTable.load(path)
+    else:
+        Vg, gg = np.meshgrid(V, gamma, indexing='ij')
+        x, u, converged = trim(vehicle, Vg, gg)
+        A, B = linearize(vehicle, x, u)
+        table = TrimTable(V=V, gamma=gamma, x=x, u=u, A=A, B=B,
+                          converged=converged)
+        if path is not None:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            table.save(path)
+    _tables[key] = table
+    return table
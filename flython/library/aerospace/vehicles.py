@@ -85,3 +85,39 @@ class Birdie:
         Fz = Fa[2] + Fg[2]
 
         return Fx, Fz, M
+
+    @classmethod
+    def external_inputs_batch(cls, x, u):
+        """Array-aware external_inputs, x and u stacked along axis 0"""
+
+        g = 9.81
+        rho = 1.225
+
+        x = np.asarray(x, float)
+        u = np.asarray(u, float)
+        theta = x[..., 3]
+        T, M, wind_x, wind_z = np.moveaxis(u, -1, 0)
+
+        s_th = np.sin(theta)
+        c_th = np.cos(theta)
+
+        # Velocity relative to air, wind transformed to body axes
+        vel_x = x[..., 0] - (c_th * wind_x - s_th * wind_z)
+        vel_z = x[..., 1] - (s_th * wind_x + c_th * wind_z)
+
+        q_inf = 0.5 * rho * (vel_x ** 2 + vel_z ** 2)
+
+        alpha = np.arctan(vel_z / vel_x)
+        CL = np.interp(alpha, cls.alpha, cls.CL)
+        CD = np.interp(alpha, cls.alpha, cls.CD)
+
+        L = q_inf * cls.Sw * CL
+        D = q_inf * cls.Sw * CD
+
+        # Aerodynamic and gravity forces in body axes
+        s_alpha = np.sin(alpha)
+        c_alpha = np.cos(alpha)
+        Fx = - c_alpha * D + s_alpha * L - s_th * g * cls.mass + T
+        Fz = - s_alpha * D - c_alpha * L + c_th * g * cls.mass
+
+        return Fx, Fz, M
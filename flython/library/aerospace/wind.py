@@ -16,6 +16,7 @@ class WindfieldXZ(discrete.Static):
                    'sample_time', 'dtype')
     _defaults = dict(scale_factor=1, noise_variance=0, sample_time=-1,
                      dtype=[('Vx', '<f8'), ('Vz', '<f8')])
+    _depends = ('field', )
 
     def g(self, x, u):
 
@@ -27,6 +28,17 @@ class WindfieldXZ(discrete.Static):
 
         return V + self.noise_variance * np.random.randn(2)
 
+    def _replay(self, u_series):
+
+        # Noise drawn in the order of the step by step calls
+        u = np.asarray(u_series, float)
+        V = self.scale_factor * np.column_stack((
+            np.interp(u, self.xinterp, self.Vxinterp),
+            np.interp(u, self.xinterp, self.Vzinterp)
+        ))
+
+        return V + self.noise_variance * np.random.randn(len(u), 2)
+
     def _validate(self):
 
         self.xinterp = np.array([windvector.x for windvector in self.field])
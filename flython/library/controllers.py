@@ -1,4 +1,5 @@
-from numpy import zeros
+from numpy import asarray, concatenate, cumsum, zeros
+from scipy.signal import lfilter
 
 from flython import discrete
 
@@ -12,12 +13,16 @@ class P(discrete.Static):
     def g(self, x, u):
         return self.Kp * u
 
+    def _replay(self, u_series):
+        return self.Kp * asarray(u_series, float)
+
 
 class PID(discrete.NormalOrder):
 
     _parameters = ('Kp', 'Ki', 'Kd', 'sample_time', 'dtype')
     _defaults = dict(sample_time=-1, dtype=[('u', '<f8')])
     _x = zeros(3)
+    _depends = ('Ki', 'Kd', 'sample_time')
 
     def f(self, x, u):
 
@@ -40,6 +45,19 @@ class PID(discrete.NormalOrder):
 
         return yp + yi + yd
 
+    def _replay(self, u_series):
+
+        Ci, Cd = self._aux_vars
+        u = asarray(u_series, float)
+        # Previous inputs
+        v = concatenate(([self.x[2]], u[:-1]))
+
+        yi = self.x[0] + Ci * cumsum(u + v)
+        # yd(k) = - yd(k-1) + Cd * (u(k) - u(k-1))
+        yd = lfilter([Cd, 0], [1, 1], u - v, zi=[-self.x[1]])[0]
+
+        return self.Kp * u + yi + yd
+
     def _validate(self):
         self._aux_vars = (0.5 * self.Ki * self.sample_time,
                           2 * self.Kd / self.sample_time)
@@ -50,6 +68,7 @@ class PIrD(discrete.NormalOrder):
     _parameters = ('Kp', 'Ki', 'Kd', 'alpha', 'sample_time', 'dtype')
     _defaults = dict(alpha=.1, sample_time=-1, dtype=[('u', '<f8')])
     _x = zeros(3)
+    _depends = ('Ki', 'Kd', 'alpha', 'sample_time')
 
     def f(self, x, u):
 
@@ -72,6 +91,19 @@ class PIrD(discrete.NormalOrder):
 
         return yp + yi + yd
 
+    def _replay(self, u_series):
+
+        Ci, D1, D2 = self._aux_vars
+        u = asarray(u_series, float)
+        # Previous inputs
+        v = concatenate(([self.x[2]], u[:-1]))
+
+        yi = self.x[0] + Ci * cumsum(u + v)
+        # yd(k) = - D1 * yd(k-1) + D2 * (u(k) - u(k-1))
+        yd = lfilter([D2, 0], [1, D1], u - v, zi=[-D1 * self.x[1]])[0]
+
+        return self.Kp * u + yi + yd
+
     def _validate(self):
         self._aux_vars = (0.5 * self.Ki * self.sample_time,
                           (2 * self.alpha - self.sample_time) /
@@ -84,6 +116,7 @@ class PIDRealEuler(discrete.NormalOrder):
     _parameters = ('Kp', 'Ki', 'Kd',  'alpha', 'sample_time', 'dtype')
     _defaults = dict(sample_time=-1, dtype=[('u', '<f8')])
     _x = zeros(3)
+    _depends = ('Ki', 'Kd', 'sample_time')
 
     def f(self, x, u):
 
@@ -111,6 +144,21 @@ class PIDRealEuler(discrete.NormalOrder):
 
         return yp + yi + yd
 
+    def _replay(self, u_series):
+
+        Ci, Cd = self._aux_vars
+        u = asarray(u_series, float)
+        # Previous inputs
+        v = concatenate(([self.x[2]], u[:-1]))
+
+        yi = self.x[0] + Ci * cumsum(u)
+        # yd(k) = (1 - alpha) * yd(k-1) + alpha * Cd * (u(k) - u(k-1))
+        a = self.alpha
+        yd = lfilter([a * Cd, 0], [1, a - 1], u - v,
+                     zi=[(1 - a) * self.x[1]])[0]
+
+        return self.Kp * u + yi + yd
+
     def _validate(self):
         self._aux_vars = (self.Ki * self.sample_time,
                           self.Kd / self.sample_time)
@@ -121,6 +169,7 @@ class PIDss(discrete.ReverseOrder):
     _parameters = ('Kp', 'Ki', 'Kd', 'sample_time', 'dtype')
     _defaults = dict(sample_time=-1, dtype=[('u', '<f8')])
     _x = zeros(2)
+    _depends = ('Ki', 'Kd', 'sample_time')
 
     def f(self, x, u):
 
@@ -143,6 +192,16 @@ class PIDss(discrete.ReverseOrder):
 
         return yp + yi + yd
 
+    def _replay(self, u_series):
+
+        Ci, Cd = self._aux_vars
+        u = asarray(u_series, float)
+        # x0(k+1) = - x0(k) + 2 * (Cd - Ci) * u(k), g uses x0(k)
+        x0 = lfilter([2 * (Cd - Ci), 0], [1, 1], u, zi=[-self.x[0]])[0]
+        x0 = concatenate(([self.x[0]], x0[:-1]))
+
+        return self.Kp * u + x0 + Ci * u + self.x[1] + Cd * u
+
     def _validate(self):
         self._aux_vars = (0.5 * self.Ki * self.sample_time,
                           2 * self.Kd / self.sample_time)
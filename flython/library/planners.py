@@ -18,17 +18,27 @@ class Constant(discrete.Static):
     def g(self, x, u):
         return self.setpoint
 
+    def _replay(self, u_series):
+        setpoint = np.asarray(self.setpoint, float)
+        return np.broadcast_to(
+            setpoint, (len(u_series), ) + setpoint.shape).copy()
+
 
 class PlannerXZ(discrete.Static):
 
     _parameters = ('plan', 'sample_time', 'dtype')
     _defaults = dict(sample_time=-1, dtype=[('xr', '<f8'), ('zr', '<f8')])
+    _depends = ('plan', )
 
     def g(self, x, u):
 
         # u contains x_vehicle
         return np.array([u, np.interp(u, self.xinterp, self.zinterp)])
 
+    def _replay(self, u_series):
+        u = np.asarray(u_series, float)
+        return np.column_stack((u, np.interp(u, self.xinterp, self.zinterp)))
+
     def _validate(self):
 
         self.xinterp = np.array([waypoint.x for waypoint in self.plan])
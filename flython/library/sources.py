@@ -0,0 +1,116 @@
+import numpy as np
+
+from flython import discrete
+
+
+class Series(discrete.Static):
+    """Base class of time series sources, the input is the time
+
+    Samples are given either at the times in `time` or every `period`
+    seconds from `t0`. Outputs are held (interpolation='zoh') or
+    interpolated linearly ('linear') and held beyond the data range.
+    Lookups in `time` move a cursor forward, so they take constant time
+    when the simulation advances. Uniform samples are indexed directly;
+    at the sample times they are returned as views of the data, without
+    interpolation.
+
+    """
+
+    def _setup(self, values, time):
+
+        if self.interpolation not in ('zoh', 'linear'):
+            raise ValueError("Incorrect interpolation in block '{}', "
+                             "use 'zoh' or 'linear'.".format(self._name))
+        if (time is None) == (self.period is None):
+            raise ValueError("Block '{}' needs either time or period."
+                             .format(self._name))
+        self._values = values
+        self._time = None if time is None else np.asarray(time, float)
+        self._linear = self.interpolation == 'linear'
+        self._cursor = 0
+
+    def _index(self, t):
+        """Return index of the last sample at or before t, and weight"""
+
+        if self._time is None:
+            s = (t - self.t0) / self.period
+            i = round(s)
+            if abs(s - i) < 1e-9:
+                # On a sample time, no interpolation needed
+                return i, 0.
+            i = int(np.floor(s))
+            return i, s - i
+
+        time = self._time
+        i = self._cursor
+        if t < time[i]:
+            # Time went back, e.g. after an event
+            i = max(np.searchsorted(time, t, 'right') - 1, 0)
+        while i + 1 < len(time) and time[i+1] <= t:
+            i += 1
+        self._cursor = i
+        if i + 1 < len(time) and t > time[i]:
+            return i, (t - time[i]) / (time[i+1] - time[i])
+        return i, 0.
+
+    def g(self, x, u):
+
+        # u contains the time
+        values = self._values
+        i, w = self._index(u)
+        if i < 0:
+            return values[0]
+        if i >= len(values) - 1:
+            return values[-1]
+        if w and self._linear:
+            return values[i] + (values[i+1] - values[i]) * w
+        return values[i]
+
+
+class FromArray(Series):
+    """Time series source of an array, one sample per row"""
+
+    _parameters = ('data', 'time', 'period', 't0', 'interpolation',
+                   'sample_time', 'dtype')
+    _defaults = dict(time=None, period=None, t0=0, interpolation='zoh',
+                     sample_time=-1, dtype=[('y', '<f8')])
+    _depends = ('data', 'time', 'period', 't0', 'interpolation',
+                'sample_time')
+
+    def _validate(self):
+        self._setup(np.asarray(self.data), self.time)
+
+
+class FromFile(Series):
+    """Time series source of a memory-mapped .npy or raw binary file
+
+    Raw files hold rows of raw_dtype values with one column per field
+    of dtype. With timestamps the first column holds the sample times.
+
+    """
+
+    _parameters = ('path', 'timestamps', 'raw_dtype', 'time', 'period',
+                   't0', 'interpolation', 'sample_time', 'dtype')
+    _defaults = dict(timestamps=False, raw_dtype='<f8', time=None,
+                     period=None, t0=0, interpolation='zoh',
+                     sample_time=-1, dtype=[('y', '<f8')])
+    _depends = ('path', 'timestamps', 'raw_dtype', 'time', 'period',
+                't0', 'interpolation', 'sample_time')
+
+    def _validate(self):
+
+        path = str(self.path)
+        if path.endswith('.npy'):
+            data = np.load(path, mmap_mode='r')
+        else:
+            columns = len(self.dtype) + bool(self.timestamps)
+            data = np.memmap(path, self.raw_dtype, 'r')
+            data = data.reshape(-1, columns)
+        if data.ndim == 2 and data.shape[1] == 1 and not self.timestamps:
+            data = data[:, 0]
+        time = self.time
+        if self.timestamps:
+            time, data = data[:, 0], data[:, 1:]
+            if data.shape[1] == 1:
+                data = data[:, 0]
+        self._setup(data, time)